@@ -0,0 +1,422 @@
+import numpy as np
+from constants import CELL_SIZE, DOT_POINTS, POWERUP_POINTS
+from game import LEVEL_FILE, PACMAN_START, GHOST_STARTS
+from ghost import Ghost
+from pacman import Pacman
+from level import Level, DOT, POWERUP
+import directions
+from directions import NONE, LEFT
+from director import PHASE_ENDS, CLYDE_SHY_DISTANCE, scatter_corners
+from distances import UNREACHABLE
+
+# N games advanced in lockstep. All per-game state lives in NumPy arrays and
+# one step() applies the rules of Pacman.move, Ghost.update/choose_direction
+# and GameState.step to every game at once. Static level data (walkability,
+# exits, maze distances) is shared by all games.
+#
+# Directions are the same integer codes as the scalar game (directions.py),
+# used directly as indexes into NumPy versions of its lookup tables.
+# Ghost random targets come from a NumPy generator, so runs are reproducible
+# per seed but do not follow the same random stream as scalar games.
+
+DX = np.array(directions.DX, dtype=np.int32)
+DY = np.array(directions.DY, dtype=np.int32)
+OPPOSITE = np.array(directions.OPPOSITE, dtype=np.int8)
+FAR_EDGE = np.array(directions.FAR_EDGE, dtype=bool)
+
+EMPTY = 0
+
+PACMAN_SPEED = Pacman.SPEED
+GHOST_SPEED = Ghost.SPEED
+SCARED_TIME = Ghost.SCARED_TIME
+
+
+class BatchGame:
+    def __init__(self, n, level_file=LEVEL_FILE, seed=None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        level = Level(level_file)
+        self.width = width = level.width
+        self.height = height = level.height
+
+        # Walkability padded by a wall border, so neighbour and edge checks
+        # one cell off the grid need no bounds tests
+        self.walkable = np.zeros((height + 2, width + 2), dtype=bool)
+        self.walkable[1:-1, 1:-1] = np.frombuffer(level.walkable, dtype=np.uint8).reshape(height, width) == 1
+
+        # exits[cell, direction] for direction codes 1..4, column 0 unused
+        self.exits = np.zeros((width * height, 5), dtype=bool)
+        for cell, cell_exits in enumerate(level.exits):
+            for direction, _, _ in cell_exits:
+                self.exits[cell, direction] = True
+        # forced[cell, arriving direction] is the only way a ghost can go
+        # from there (the way it is already going if it is stuck), or NONE
+        # at intersections where it has to pick by target
+        self.forced = np.zeros((width * height, 5), dtype=np.int8)
+        for cell, cell_turns in enumerate(level.turns):
+            for direction, onward in enumerate(cell_turns):
+                if len(onward) == 1:
+                    self.forced[cell, direction] = onward[0][0]
+                elif not onward:
+                    self.forced[cell, direction] = direction
+
+        # Full maze distance matrix, [target index, cell index]. Mazes too
+        # big for one (see distances.FULL_MATRIX_LIMIT) leave it None and
+        # fetch rows from the table for just the targets in use, as the
+        # scalar ghosts do.
+        self.table = table = level.distances
+        self.cell_index = np.frombuffer(table.index, dtype=np.int32)
+        self.distances = None
+        if not table.lazy:
+            table.compute_all()
+            self.distances = np.frombuffer(table.matrix, dtype=np.uint16).reshape(table.count, table.count)
+
+        self.initial_items = np.frombuffer(level.initial_items, dtype=np.uint8)
+
+        g = len(GHOST_STARTS)
+        self.ghost_start_x = np.array([x for x, _, _ in GHOST_STARTS], dtype=np.int32)
+        self.ghost_start_y = np.array([y for _, y, _ in GHOST_STARTS], dtype=np.int32)
+        self.ghost_types = [ghost_type for _, _, ghost_type in GHOST_STARTS]
+        self.corners = scatter_corners(width, height)
+        # Inky's target is relative to the first Blinky, as in GhostDirector
+        self.blinky = self.ghost_types.index('blinky') if 'blinky' in self.ghost_types else None
+        # Worked out at the start of every step, see GhostDirector.update()
+        self.scatter = np.zeros(n, dtype=bool)
+        self.blinky_x = np.zeros(n, dtype=np.int32)
+        self.blinky_y = np.zeros(n, dtype=np.int32)
+
+        self.pacman_x = np.zeros(n, dtype=np.int32)  # pixels
+        self.pacman_y = np.zeros(n, dtype=np.int32)
+        self.pacman_grid_x = np.zeros(n, dtype=np.int32)
+        self.pacman_grid_y = np.zeros(n, dtype=np.int32)
+        # Pacman's cell before the current tick, for the swept collision test
+        self.pacman_prev_grid_x = np.zeros(n, dtype=np.int32)
+        self.pacman_prev_grid_y = np.zeros(n, dtype=np.int32)
+        self.pacman_direction = np.zeros(n, dtype=np.int8)
+        self.queued_direction = np.zeros(n, dtype=np.int8)
+        self.ghost_score_multiplier = np.ones(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.complete = np.zeros(n, dtype=bool)
+        self.game_over = np.zeros(n, dtype=bool)
+
+        self.ghost_x = np.zeros((n, g), dtype=np.int32)  # pixels
+        self.ghost_y = np.zeros((n, g), dtype=np.int32)
+        self.ghost_grid_x = np.zeros((n, g), dtype=np.int32)
+        self.ghost_grid_y = np.zeros((n, g), dtype=np.int32)
+        self.ghost_direction = np.zeros((n, g), dtype=np.int8)
+        self.vulnerable = np.zeros((n, g), dtype=bool)
+        self.vulnerability_timer = np.zeros((n, g), dtype=np.int32)
+        self.returning_home = np.zeros((n, g), dtype=bool)
+
+        self.items = np.zeros((n, width * height), dtype=np.uint8)
+        self.items_left = np.zeros(n, dtype=np.int32)
+        self.reset()
+
+    @property
+    def done(self):
+        return self.complete | self.game_over
+
+    def reset(self, games=None):
+        # Start the selected games (a bool mask or index array, default all)
+        # from scratch
+        if games is None:
+            games = slice(None)
+        self.items[games] = self.initial_items
+        self.items_left[games] = np.count_nonzero(self.initial_items)
+        self.score[games] = 0
+        self.lives[games] = 3
+        self.ticks[games] = 0
+        self.complete[games] = False
+        self.game_over[games] = False
+        self.vulnerability_timer[games] = 0
+        self.reset_positions(games)
+
+    def reset_positions(self, games):
+        # Same as GameState.reset_positions, for the selected games
+        self.pacman_grid_x[games] = PACMAN_START[0]
+        self.pacman_grid_y[games] = PACMAN_START[1]
+        self.pacman_x[games] = PACMAN_START[0] * CELL_SIZE
+        self.pacman_y[games] = PACMAN_START[1] * CELL_SIZE
+        self.pacman_direction[games] = NONE
+        self.queued_direction[games] = NONE
+        self.ghost_score_multiplier[games] = 1
+
+        self.ghost_grid_x[games] = self.ghost_start_x
+        self.ghost_grid_y[games] = self.ghost_start_y
+        self.ghost_x[games] = self.ghost_start_x * CELL_SIZE
+        self.ghost_y[games] = self.ghost_start_y * CELL_SIZE
+        self.ghost_direction[games] = LEFT
+        self.vulnerable[games] = False
+        self.returning_home[games] = False
+
+    def is_walkable(self, x, y):
+        return self.walkable[y + 1, x + 1]
+
+    def step(self, actions=None):
+        # Advance every unfinished game by one tick. `actions` is an array of
+        # direction codes (0 keeps the current input). Returns the done mask.
+        active = ~self.done
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int8)
+            queue = active & (actions != NONE)
+            self.queued_direction[queue] = actions[queue]
+
+        self.pacman_prev_grid_x[:] = self.pacman_grid_x
+        self.pacman_prev_grid_y[:] = self.pacman_grid_y
+        power_pellet_eaten = self.move_pacman(active)
+        # Power pellet makes every ghost vulnerable
+        scare = power_pellet_eaten[:, None]
+        self.vulnerable |= scare
+        self.vulnerability_timer[:] = np.where(scare, SCARED_TIME, self.vulnerability_timer)
+
+        # What GhostDirector.update() works out: the phase, and Blinky's cell
+        # before any ghost moves
+        phase = np.searchsorted(PHASE_ENDS, self.ticks, side='right')
+        self.scatter[:] = (phase % 2 == 0) & (self.ticks < PHASE_ENDS[-1])
+        if self.blinky is not None:
+            self.blinky_x[:] = self.ghost_grid_x[:, self.blinky]
+            self.blinky_y[:] = self.ghost_grid_y[:, self.blinky]
+
+        dead = np.zeros(self.n, dtype=bool)
+        for ghost in range(len(self.ghost_types)):
+            dead |= self.update_ghost(ghost, active)
+
+        self.ticks += active
+        complete = active & (self.items_left == 0)
+        self.complete |= complete
+
+        dead &= active & ~complete
+        self.lives -= dead
+        game_over = dead & (self.lives <= 0)
+        self.game_over |= game_over
+        respawn = dead & ~game_over
+        if respawn.any():
+            self.reset_positions(respawn)
+        return self.done
+
+    def move_pacman(self, active):
+        # Pacman.move for every game; returns where a power pellet was eaten
+        games = np.arange(self.n)
+        x, y = self.pacman_x, self.pacman_y
+        grid_x, grid_y = self.pacman_grid_x, self.pacman_grid_y
+
+        # Try to make the queued turn first
+        queued = self.queued_direction
+        aligned = (x % CELL_SIZE == 0) & (y % CELL_SIZE == 0)
+        turn = active & (queued != NONE) & aligned
+        turn &= self.is_walkable(grid_x + DX[queued], grid_y + DY[queued])
+        self.pacman_direction[turn] = queued[turn]
+        queued[turn] = NONE
+
+        direction = self.pacman_direction
+        moving = active & (direction != NONE)
+        next_x = x + DX[direction] * PACMAN_SPEED
+        next_y = y + DY[direction] * PACMAN_SPEED
+        next_grid_x = next_x // CELL_SIZE
+        next_grid_y = next_y // CELL_SIZE
+        valid = self.is_walkable(next_grid_x, next_grid_y)
+        # For right and down movement, check the far edge
+        far_edge = FAR_EDGE[direction]
+        edge_x = (next_x + (CELL_SIZE - 1)) // CELL_SIZE
+        edge_y = (next_y + (CELL_SIZE - 1)) // CELL_SIZE
+        valid &= ~far_edge | self.is_walkable(edge_x, edge_y)
+
+        # Snap to grid if we can't move
+        blocked = moving & ~valid
+        x[blocked] = grid_x[blocked] * CELL_SIZE
+        y[blocked] = grid_y[blocked] * CELL_SIZE
+
+        go = moving & valid
+        x[go] = next_x[go]
+        y[go] = next_y[go]
+        entered = go & ((next_grid_x != grid_x) | (next_grid_y != grid_y))
+        grid_x[entered] = next_grid_x[entered]
+        grid_y[entered] = next_grid_y[entered]
+
+        # Collect whatever is in a newly entered cell
+        cells = grid_y * self.width + grid_x
+        item = np.where(entered, self.items[games, cells], EMPTY)
+        collected = item != EMPTY
+        self.items[games[collected], cells[collected]] = EMPTY
+        self.items_left -= collected
+        self.score += np.where(item == DOT, DOT_POINTS, 0) + np.where(item == POWERUP, POWERUP_POINTS, 0)
+        power_pellet_eaten = item == POWERUP
+        # Reset ghost score multiplier when a new power pellet is eaten
+        self.ghost_score_multiplier[power_pellet_eaten] = 1
+        return power_pellet_eaten
+
+    def target_tiles(self, ghost, games, grid_x, grid_y):
+        # Ghost.get_target_tile for one ghost slot in the selected games
+        # (an index array); grid_x/grid_y are the ghost's cells in those games
+        ghost_type = self.ghost_types[ghost]
+        pacman_x, pacman_y = self.pacman_grid_x[games], self.pacman_grid_y[games]
+        if ghost_type == 'blinky':
+            target_x, target_y = pacman_x, pacman_y
+        elif ghost_type == 'pinky':
+            direction = self.pacman_direction[games]
+            target_x = pacman_x + 4 * DX[direction]
+            target_y = pacman_y + 4 * DY[direction]
+        elif ghost_type == 'inky':
+            # Vector from Blinky to 2 tiles ahead, doubled
+            direction = self.pacman_direction[games]
+            if self.blinky is not None:
+                blinky_x, blinky_y = self.blinky_x[games], self.blinky_y[games]
+            else:
+                blinky_x, blinky_y = pacman_x, pacman_y
+            target_x = 2 * (pacman_x + 2 * DX[direction]) - blinky_x
+            target_y = 2 * (pacman_y + 2 * DY[direction]) - blinky_y
+        elif ghost_type == 'clyde':
+            corner_x, corner_y = self.corners['clyde']
+            far = (grid_x - pacman_x) ** 2 + (grid_y - pacman_y) ** 2 > CLYDE_SHY_DISTANCE ** 2
+            target_x = np.where(far, pacman_x, corner_x)
+            target_y = np.where(far, pacman_y, corner_y)
+        else:
+            target_x, target_y = self.random_targets(len(games))
+
+        if ghost_type in self.corners:
+            # Every ghost heads for its own corner while scattering
+            corner_x, corner_y = self.corners[ghost_type]
+            scatter = self.scatter[games]
+            target_x = np.where(scatter, corner_x, target_x)
+            target_y = np.where(scatter, corner_y, target_y)
+
+        home_x, home_y = self.ghost_start_x[ghost], self.ghost_start_y[ghost]
+        returning = self.returning_home[games, ghost]
+        target_x = np.where(returning, home_x, target_x)
+        target_y = np.where(returning, home_y, target_y)
+
+        vulnerable = self.vulnerable[games, ghost]
+        if vulnerable.any():
+            random_x, random_y = self.random_targets(len(games))
+            target_x = np.where(vulnerable, random_x, target_x)
+            target_y = np.where(vulnerable, random_y, target_y)
+        return target_x, target_y
+
+    def maze_distances(self, target_index, cell_index):
+        # distance[i, j] from cell_index[i, j] to target_index[i], by dense
+        # index, as float64
+        if self.distances is not None:
+            return self.distances[target_index[:, None], cell_index].astype(np.float64)
+        targets, rows = np.unique(target_index, return_inverse=True)
+        table = self.table
+        matrix = np.empty((len(targets), table.count), dtype=np.uint16)
+        for row, target in zip(matrix, targets):
+            cell = table.cells[target]
+            row[:] = np.frombuffer(table.row(cell % self.width, cell // self.width), dtype=np.uint16)
+        return matrix[rows.reshape(-1)[:, None], cell_index].astype(np.float64)
+
+    def random_targets(self, count):
+        return (self.rng.integers(0, self.width, count, dtype=np.int32),
+                self.rng.integers(0, self.height, count, dtype=np.int32))
+
+    def choose_directions(self, ghost, choosing):
+        # Ghost.choose_direction for the games where this ghost is aligned.
+        # Corridors and corners come straight from the forced table; targets
+        # are only worked out for the games where the ghost is at an
+        # intersection.
+        grid_x = self.ghost_grid_x[:, ghost]
+        grid_y = self.ghost_grid_y[:, ghost]
+        direction = self.ghost_direction[:, ghost]
+        cells = np.where(choosing, grid_y * self.width + grid_x, 0)
+        forced = self.forced[cells, direction]
+        chosen = np.where(choosing, forced, direction)
+        deciding = np.flatnonzero(choosing & (forced == NONE))
+        if deciding.size:
+            chosen[deciding] = self.decide(ghost, deciding, cells[deciding])
+        return chosen
+
+    def decide(self, ghost, games, cells):
+        # Pick the exit closest to the ghost's target in the selected games
+        grid_x = self.ghost_grid_x[games, ghost]
+        grid_y = self.ghost_grid_y[games, ghost]
+        direction = self.ghost_direction[games, ghost]
+        rows = np.arange(len(games))
+
+        exits = self.exits[cells]
+        opposite = OPPOSITE[direction]
+        possible = exits.copy()
+        possible[rows, opposite] = False
+        possible[:, 0] = False
+        # If no valid directions (except the opposite), allow reversing
+        reverse = np.where(exits[rows, opposite], opposite, direction)
+
+        target_x, target_y = self.target_tiles(ghost, games, grid_x, grid_y)
+        next_x = grid_x[:, None] + DX[None, 1:]
+        next_y = grid_y[:, None] + DY[None, 1:]
+
+        # Maze distance where the target is a walkable cell, straight-line
+        # distance otherwise, exactly as the scalar ghosts do
+        on_grid = (target_x >= 0) & (target_x < self.width) & (target_y >= 0) & (target_y < self.height)
+        target_index = np.where(on_grid, self.cell_index[np.where(on_grid, target_y * self.width + target_x, 0)], -1)
+        next_cells = np.clip(next_y, 0, self.height - 1) * self.width + np.clip(next_x, 0, self.width - 1)
+        next_index = self.cell_index[next_cells]
+        distance = self.maze_distances(np.maximum(target_index, 0), np.maximum(next_index, 0))
+        straight = (target_index < 0)[:, None] | (next_index < 0) | (distance == UNREACHABLE)
+        euclidean = np.sqrt((next_x - target_x[:, None]) ** 2.0 + (next_y - target_y[:, None]) ** 2.0)
+        distance = np.where(straight, euclidean, distance)
+        distance[~possible[:, 1:]] = np.inf
+        # argmin keeps the first of equal distances, like the scalar loop
+        best = (np.argmin(distance, axis=1) + 1).astype(np.int8)
+
+        return np.where(possible.any(axis=1), best, reverse)
+
+    def update_ghost(self, ghost, active):
+        # Ghost.update for one ghost slot; returns where Pacman got caught
+        x = self.ghost_x[:, ghost]
+        y = self.ghost_y[:, ghost]
+        grid_x = self.ghost_grid_x[:, ghost]
+        grid_y = self.ghost_grid_y[:, ghost]
+        vulnerable = self.vulnerable[:, ghost].copy()
+
+        # Update direction when aligned with grid
+        aligned = active & (x % CELL_SIZE == 0) & (y % CELL_SIZE == 0)
+        if aligned.any():
+            self.ghost_direction[:, ghost] = self.choose_directions(ghost, aligned)
+        direction = self.ghost_direction[:, ghost]
+
+        # Vulnerable ghosts move at half speed
+        speed = np.where(vulnerable, GHOST_SPEED // 2, GHOST_SPEED)
+        next_x = x + DX[direction] * speed
+        next_y = y + DY[direction] * speed
+        next_grid_x = next_x // CELL_SIZE
+        next_grid_y = next_y // CELL_SIZE
+        valid = self.is_walkable(next_grid_x, next_grid_y)
+        far_edge = FAR_EDGE[direction]
+        edge_x = (next_x + (CELL_SIZE - 1)) // CELL_SIZE
+        edge_y = (next_y + (CELL_SIZE - 1)) // CELL_SIZE
+        valid &= ~far_edge | self.is_walkable(edge_x, edge_y)
+
+        blocked = active & ~valid
+        go = active & valid
+        prev_grid_x, prev_grid_y = grid_x.copy(), grid_y.copy()
+        self.ghost_x[:, ghost] = np.where(blocked, grid_x * CELL_SIZE, np.where(go, next_x, x))
+        self.ghost_y[:, ghost] = np.where(blocked, grid_y * CELL_SIZE, np.where(go, next_y, y))
+        self.ghost_grid_x[:, ghost] = grid_x = np.where(go, next_grid_x, grid_x)
+        self.ghost_grid_y[:, ghost] = grid_y = np.where(go, next_grid_y, grid_y)
+
+        # Check collision with Pacman: sharing a cell or swapping cells, see
+        # collisions.py
+        caught = (grid_x == self.pacman_grid_x) & (grid_y == self.pacman_grid_y)
+        caught |= ((grid_x == self.pacman_prev_grid_x) & (grid_y == self.pacman_prev_grid_y)
+                   & (prev_grid_x == self.pacman_grid_x) & (prev_grid_y == self.pacman_grid_y))
+        caught &= active
+        eaten = caught & vulnerable
+        self.returning_home[eaten, ghost] = True
+        self.vulnerable[eaten, ghost] = False
+        # Score for eating a ghost doubles for each ghost eaten during one power pellet
+        self.score[eaten] += 200 * self.ghost_score_multiplier[eaten]
+        self.ghost_score_multiplier[eaten] *= 2
+
+        # Update vulnerability timer
+        scared = active & self.vulnerable[:, ghost]
+        self.vulnerability_timer[scared, ghost] -= 1
+        expired = scared & (self.vulnerability_timer[:, ghost] <= 0)
+        self.vulnerable[expired, ghost] = False
+
+        # Check if returned home
+        home = (active & self.returning_home[:, ghost]
+                & (grid_x == self.ghost_start_x[ghost]) & (grid_y == self.ghost_start_y[ghost]))
+        self.returning_home[home, ghost] = False
+        return caught & ~vulnerable
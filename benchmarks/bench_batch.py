@@ -0,0 +1,158 @@
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from batch import BatchGame
+from directions import ALL
+from game import GameState, LEVEL_FILE
+
+# Steps per second of BatchGame against a Python loop over N GameStates.
+# Every game gets a random new direction now and then, and finished games
+# are restarted so all N keep running. Run from the repository root:
+#
+#     python -m benchmarks.bench_batch --games 1 64 1024 --steps 500
+#
+# BatchGame re-implements the game rules, so --verify instead plays N
+# scalar games and a BatchGame side by side on the same inputs and checks
+# every game's state after every tick. Random ghost targets come from the
+# tick and the ghost rather than an RNG, so both sides get the same ones.
+# Exits with status 1 on the first difference:
+#
+#     python -m benchmarks.bench_batch --verify --games 64 --steps 3000
+
+
+def random_actions(rng, n, steps):
+    turns = rng.random((steps, n)) < 0.05
+    return rng.integers(1, len(ALL) + 1, (steps, n)) * turns
+
+
+def bench_scalar(n, actions, level_file=LEVEL_FILE):
+    games = [GameState(level_file) for _ in range(n)]
+    start = time.perf_counter()
+    for tick_actions in actions.tolist():
+        for i, game in enumerate(games):
+            if game.step(tick_actions[i]):
+                games[i] = GameState(level_file)
+    return time.perf_counter() - start
+
+
+def bench_batch(n, actions, seed, level_file=LEVEL_FILE):
+    batch = BatchGame(n, level_file, seed=seed)
+    start = time.perf_counter()
+    for tick_actions in actions:
+        done = batch.step(tick_actions)
+        if done.any():
+            batch.reset(done)
+    return time.perf_counter() - start
+
+
+def fixed_target(tick, ghost, width, height):
+    # The random target of ghost slot `ghost` on `tick`, for --verify
+    return (tick * 7 + ghost * 3) % width, (tick * 5 + ghost * 11) % height
+
+
+class FixedRandom:
+    # Stands in for a scalar ghost's rng. Ghost.get_random_target() asks
+    # for x and then y, so calls alternate between the two.
+    def __init__(self, clock, ghost, width, height):
+        self.clock = clock
+        self.ghost = ghost
+        self.width = width
+        self.height = height
+        self.calls = 0
+
+    def randint(self, low, high):
+        target = fixed_target(self.clock[0], self.ghost, self.width, self.height)
+        self.calls += 1
+        return target[(self.calls - 1) % 2]
+
+
+class FixedTargetBatch(BatchGame):
+    # BatchGame drawing the same random targets as FixedRandom
+    def __init__(self, n, level_file, clock):
+        super().__init__(n, level_file)
+        self.clock = clock
+        self.ghost = 0
+
+    def update_ghost(self, ghost, active):
+        self.ghost = ghost
+        return super().update_ghost(ghost, active)
+
+    def random_targets(self, count):
+        x, y = fixed_target(self.clock[0], self.ghost, self.width, self.height)
+        return np.full(count, x, dtype=np.int32), np.full(count, y, dtype=np.int32)
+
+
+def scalar_state(game):
+    pacman = game.pacman
+    return (pacman.pixel_x, pacman.pixel_y, pacman.score, pacman.lives, game.done,
+            [(int(ghost.pixel_x), int(ghost.pixel_y), ghost.direction, ghost.vulnerable, ghost.returning_home)
+             for ghost in game.ghosts])
+
+
+def batch_state(batch, i):
+    return (int(batch.pacman_x[i]), int(batch.pacman_y[i]), int(batch.score[i]), int(batch.lives[i]),
+            bool(batch.done[i]),
+            [(int(batch.ghost_x[i, g]), int(batch.ghost_y[i, g]), int(batch.ghost_direction[i, g]),
+              bool(batch.vulnerable[i, g]), bool(batch.returning_home[i, g]))
+             for g in range(len(batch.ghost_types))])
+
+
+def verify(n, actions, level_file):
+    # Returns the number of ticks checked, or exits at the first difference
+    clock = [0]
+    batch = FixedTargetBatch(n, level_file, clock)
+    games = [GameState(level_file) for _ in range(n)]
+    for game in games:
+        for slot, ghost in enumerate(game.ghosts):
+            ghost.rng = FixedRandom(clock, slot, batch.width, batch.height)
+
+    for tick, tick_actions in enumerate(actions.tolist()):
+        clock[0] = tick
+        for game, action in zip(games, tick_actions):
+            game.step(action)
+        batch.step(tick_actions)
+        for i, game in enumerate(games):
+            expected, actual = scalar_state(game), batch_state(batch, i)
+            if expected != actual:
+                print(f"tick {tick}, game {i}: scalar and batch differ\n  scalar {expected}\n  batch  {actual}")
+                sys.exit(1)
+        if all(game.done for game in games):
+            return tick + 1
+    return len(actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BatchGame vs scalar GameState throughput")
+    parser.add_argument('--games', type=int, nargs='+', default=[1, 16, 256, 1024])
+    parser.add_argument('--steps', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--level', default=LEVEL_FILE)
+    parser.add_argument('--verify', action='store_true',
+                        help="check BatchGame against scalar games tick by tick instead of timing")
+    parser.add_argument('--max-scalar-games', type=int, default=1024,
+                        help="skip the scalar loop above this many games")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.verify:
+        for n in args.games:
+            actions = random_actions(np.random.default_rng(args.seed), n, args.steps)
+            ticks = verify(n, actions, args.level)
+            print(f"{n} games, {ticks} ticks: batch matches scalar")
+        return
+
+    print(f"{'games':>7} {'scalar steps/s':>16} {'batch steps/s':>16} {'speedup':>8}")
+    for n in args.games:
+        actions = random_actions(np.random.default_rng(args.seed), n, args.steps)
+        batch_rate = n * args.steps / bench_batch(n, actions, args.seed, args.level)
+        if n <= args.max_scalar_games:
+            scalar_rate = n * args.steps / bench_scalar(n, actions, args.level)
+            print(f"{n:>7} {scalar_rate:>16,.0f} {batch_rate:>16,.0f} {batch_rate / scalar_rate:>7.1f}x")
+        else:
+            print(f"{n:>7} {'-':>16} {batch_rate:>16,.0f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import gc
+import tracemalloc
+from game import GameState, LEVEL_FILE
+from ghost import Ghost
+from level import Level
+from pacman import Pacman
+
+# Memory per game, for sizing large batches of simulated games. Games share
+# one loaded maze (as rollout workers and clones do), so this measures what
+# each additional GameState costs: its Pacman, ghosts, RNG and item bytes.
+# Snapshots are measured the same way. Run from the repository root:
+#
+#     python -m benchmarks.bench_memory --games 10000
+
+
+def measure(make, count):
+    # Bytes allocated per object, keeping all of them alive
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objects = [make() for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per GameState and per snapshot")
+    parser.add_argument('--games', type=int, default=10000)
+    args = parser.parse_args()
+
+    level = Level(LEVEL_FILE)
+    game = GameState(level=level.copy())
+    for _ in range(300):
+        game.step()
+
+    print(f"{'object':>12} {'bytes each':>12}")
+    print(f"{'GameState':>12} {measure(lambda: GameState(level=level.copy()), args.games):>12,.0f}")
+    print(f"{'Pacman':>12} {measure(lambda: Pacman(0, 0, level), args.games):>12,.0f}")
+    print(f"{'Ghost':>12} {measure(lambda: Ghost(0, 0, level, 'blinky', game.pacman), args.games):>12,.0f}")
+    print(f"{'snapshot':>12} {measure(game.snapshot, args.games):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import copy
+import time
+from game import GameState
+
+# How fast a running game can be forked, e.g. for tree search that needs to
+# try many futures from the same position. Compares restoring a snapshot
+# into an existing game, clone() and a plain copy.deepcopy of the GameState.
+# Run from the repository root:
+#
+#     python -m benchmarks.bench_snapshot --ticks 600 --repeat 20000
+
+
+def rate(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GameState snapshot/restore and clone throughput")
+    parser.add_argument('--ticks', type=int, default=600, help="ticks to play before forking")
+    parser.add_argument('--repeat', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    game = GameState(seed=args.seed)
+    for _ in range(args.ticks):
+        if game.step():
+            break
+    target = game.clone()
+
+    def snapshot_restore():
+        target.restore(game.snapshot())
+
+    def deepcopy():
+        return copy.deepcopy(game)
+
+    snapshot = game.snapshot()
+    deepcopy_repeat = max(1, args.repeat // 20)
+    print(f"{'method':>18} {'per second':>12}")
+    print(f"{'snapshot':>18} {rate(game.snapshot, args.repeat):>12,.0f}")
+    print(f"{'restore':>18} {rate(lambda: target.restore(snapshot), args.repeat):>12,.0f}")
+    print(f"{'snapshot+restore':>18} {rate(snapshot_restore, args.repeat):>12,.0f}")
+    print(f"{'clone':>18} {rate(game.clone, args.repeat):>12,.0f}")
+    print(f"{'deepcopy':>18} {rate(deepcopy, deepcopy_repeat):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
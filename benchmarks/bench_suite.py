@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Regression benchmarks for the scalar game. Micro-benchmarks time single
+# hot functions, macro-benchmarks whole headless games and offscreen
+# rendering. Each result is the best of several runs, in operations per
+# second, and the whole set can be saved as JSON and compared against a
+# run from another commit. Run from the repository root:
+#
+#     python -m benchmarks.bench_suite --output before.json
+#     ... change things ...
+#     python -m benchmarks.bench_suite --compare before.json
+#
+# Rendering uses SDL's dummy video driver, so no window is opened.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+from camera import Camera
+from collisions import collisions
+from director import GhostDirector
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from directions import ALL
+from game import GameState, LEVEL_FILE
+from ghost import Ghost
+from hud import Hud
+from level import Level
+from rollout import RandomPolicy, MAX_TICKS
+
+# name -> setup(args), which returns a run() timing one pass and
+# returning (operations, seconds) so setup is never measured
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def best_rate(run, repeat):
+    # `run()` does some work and returns (operations, seconds); keep the
+    # fastest of `repeat` runs
+    return max(operations / seconds for operations, seconds in (run() for _ in range(repeat)))
+
+
+def timed(function, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return count, time.perf_counter() - start
+
+
+@benchmark('level.load_level')
+def bench_load_level(args):
+    level = Level(args.level)
+    return lambda: timed(lambda: level.load_level(args.level), 200)
+
+
+@benchmark('level.parse')
+def bench_parse(args):
+    # Everything Level does without the compiled cache
+    return lambda: timed(lambda: Level(args.level, use_cache=False), 20)
+
+
+@benchmark('pacman.move')
+def bench_pacman_move(args):
+    game = GameState(args.level, seed=0)
+    start = game.snapshot()
+    turns = [ALL[i % len(ALL)] for i in range(7)]
+
+    def run():
+        game.restore(start)
+        pacman = game.pacman
+        count = 0
+        began = time.perf_counter()
+        for i in range(5000):
+            if i % 40 == 0:
+                pacman.queued_direction = turns[i // 40 % len(turns)]
+            pacman.move()
+            count += 1
+        return count, time.perf_counter() - began
+    return run
+
+
+@benchmark('ghost.choose_direction')
+def bench_choose_direction(args):
+    # One aligned ghost of each type on every walkable cell, heading every
+    # way, so corridors and intersections are covered in maze proportion
+    game = GameState(args.level, seed=0)
+    level = game.level
+    ghosts = []
+    for y in range(level.height):
+        for x in range(level.width):
+            if level.is_walkable(x, y):
+                for ghost_type in Ghost.COLORS:
+                    for direction in ALL:
+                        ghost = Ghost(x, y, level, ghost_type, game.pacman, game.rng)
+                        ghost.direction = direction
+                        ghosts.append(ghost)
+    # Chasing, as most of a game is
+    GhostDirector(level, game.pacman, ghosts).update(MAX_TICKS)
+
+    def run():
+        began = time.perf_counter()
+        for ghost in ghosts:
+            ghost.choose_direction()
+        return len(ghosts), time.perf_counter() - began
+    return run
+
+
+@benchmark('collisions')
+def bench_collisions(args):
+    # Ghosts checked per second by the collision pass, with a ghost on
+    # every walkable cell
+    game = GameState(args.level, seed=0)
+    level = game.level
+    ghosts = [Ghost(x, y, level, 'blinky', game.pacman, game.rng)
+              for y in range(level.height) for x in range(level.width) if level.is_walkable(x, y)]
+
+    def run():
+        began = time.perf_counter()
+        for _ in range(100):
+            collisions(game.pacman, ghosts)
+        return 100 * len(ghosts), time.perf_counter() - began
+    return run
+
+
+@benchmark('level.draw')
+def bench_level_draw(args):
+    screen = display()
+    level = Level(args.level)
+    level.build_layers()
+    return lambda: timed(lambda: level.draw(screen), 500)
+
+
+@benchmark('game.ticks')
+def bench_ticks(args):
+    # Headless ticks per second over whole games with a random player
+    def run():
+        ticks = 0
+        began = time.perf_counter()
+        for seed in range(args.games):
+            ticks += play(args.level, seed).ticks
+        return ticks, time.perf_counter() - began
+    return run
+
+
+@benchmark('game.games')
+def bench_games(args):
+    # Whole headless games per second
+    def run():
+        began = time.perf_counter()
+        for seed in range(args.games):
+            play(args.level, seed)
+        return args.games, time.perf_counter() - began
+    return run
+
+
+@benchmark('render.frames')
+def bench_render(args):
+    # Frames per second drawing everything main.py draws to an offscreen
+    # surface, one tick per frame, scrolling with Pacman on large mazes
+    display()
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    hud = Hud()
+
+    def run():
+        game = GameState(args.level, seed=0)
+        camera = Camera(game.level, SCREEN_WIDTH, SCREEN_HEIGHT)
+        policy = RandomPolicy(0)
+        began = time.perf_counter()
+        for frame in range(600):
+            if game.step(policy(game)):
+                game.reset(frame)
+            offset = camera.follow(game.pacman)
+            surface.fill('black')
+            game.level.draw(surface, offset)
+            for sprite in camera.visible([game.pacman] + game.ghosts):
+                sprite.draw(surface, 1.0, offset)
+            hud.draw(surface, game.pacman)
+        return 600, time.perf_counter() - began
+    return run
+
+
+def display():
+    if pygame.display.get_surface() is None:
+        pygame.init()
+        pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    return pygame.display.get_surface()
+
+
+def play(level_file, seed):
+    game = GameState(level_file, seed=seed)
+    policy = RandomPolicy(seed)
+    while game.ticks < MAX_TICKS and not game.step(policy(game)):
+        pass
+    return game
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro and macro benchmarks for the game")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default all): {', '.join(BENCHMARKS)}")
+    parser.add_argument('--level', default=LEVEL_FILE)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per benchmark, the best is kept")
+    parser.add_argument('--games', type=int, default=20, help="games per run for the game.* benchmarks")
+    parser.add_argument('--output', metavar='PATH', help="save results as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="JSON results to compare against")
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+
+    results = {}
+    print(f"{'benchmark':<24} {'per second':>14} {'baseline':>14} {'change':>8}")
+    for name, setup in BENCHMARKS.items():
+        if args.names and name not in args.names:
+            continue
+        rate = best_rate(setup(args), args.repeat)
+        results[name] = rate
+        line = f"{name:<24} {rate:>14,.1f}"
+        if name in baseline:
+            line += f" {baseline[name]:>14,.1f} {100 * (rate / baseline[name] - 1):>+7.1f}%"
+        print(line)
+
+    if args.output:
+        report = {
+            'commit': commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'level': args.level,
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
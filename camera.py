@@ -0,0 +1,37 @@
+from constants import CELL_SIZE
+
+# Scrolling view of a maze larger than the screen. The camera keeps the
+# sprite it follows centred, clamped so it never shows past the maze edges;
+# a maze that fits on the screen stays at the top left as it always has.
+# `offset` is the level pixel at the screen's top left, as taken by
+# Level.draw() and the sprites' draw().
+
+
+class Camera:
+    def __init__(self, level, width, height):
+        self.width = width
+        self.height = height
+        self.max_x = max(0, level.width * CELL_SIZE - width)
+        self.max_y = max(0, level.height * CELL_SIZE - height)
+        self.offset = (0, 0)
+
+    def follow(self, sprite, alpha=1.0):
+        # Centre on where `sprite` is drawn this frame
+        x = sprite.prev_pixel_x + (sprite.pixel_x - sprite.prev_pixel_x) * alpha
+        y = sprite.prev_pixel_y + (sprite.pixel_y - sprite.prev_pixel_y) * alpha
+        # Whole pixels, so the maze chunks are never blitted at fractions
+        offset_x = int(x + CELL_SIZE / 2 - self.width / 2)
+        offset_y = int(y + CELL_SIZE / 2 - self.height / 2)
+        self.offset = (min(max(offset_x, 0), self.max_x), min(max(offset_y, 0), self.max_y))
+        return self.offset
+
+    def sees(self, sprite):
+        # Whether any of a sprite's cell (or the one it is coming from) is
+        # on screen
+        offset_x, offset_y = self.offset
+        x = min(sprite.pixel_x, sprite.prev_pixel_x) - offset_x
+        y = min(sprite.pixel_y, sprite.prev_pixel_y) - offset_y
+        return -2 * CELL_SIZE < x < self.width + CELL_SIZE and -2 * CELL_SIZE < y < self.height + CELL_SIZE
+
+    def visible(self, sprites):
+        return [sprite for sprite in sprites if self.sees(sprite)]
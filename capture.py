@@ -0,0 +1,172 @@
+import argparse
+import os
+import queue
+import struct
+import threading
+import zlib
+import pygame
+from camera import Camera
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, TICK_RATE
+
+# Frame capture for QA videos and highlight reels. capture(screen) copies
+# the screen into one of a fixed pool of buffers and queues it for a
+# background encoder thread. When every buffer is still waiting to be
+# encoded the frame is skipped (and counted in `dropped`), so the game loop
+# never waits for the encoder. Output depends on the path:
+#   DIR         frame-000000.png, frame-000001.png, ... (created if needed)
+#   FILE.rgb    raw RGB24 frames back to back (.raw works too), e.g.
+#               ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i FILE.rgb out.mp4
+#
+# Run as a script it renders a recording (see replay.py) to frames without
+# a window, skipping nothing, for making captures on build machines:
+#
+#     python capture.py game.pacr frames/ --fps 30
+
+POOL_SIZE = 8  # Frames that can wait for the encoder before any are skipped
+PNG_LEVEL = 1  # zlib level; for capture, fast beats small
+RAW_EXTENSIONS = ('.rgb', '.raw')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class FrameCapture:
+    def __init__(self, path, size=(SCREEN_WIDTH, SCREEN_HEIGHT), pool_size=POOL_SIZE):
+        self.path = path
+        self.size = width, height = size
+        self.raw = path.endswith(RAW_EXTENSIONS)
+        self.file = None
+        if self.raw:
+            self.file = open(path, 'wb')
+        else:
+            os.makedirs(path, exist_ok=True)
+
+        # (pixels, surface drawing into them), so copying the screen into a
+        # buffer is a single blit
+        self.free = queue.SimpleQueue()
+        for _ in range(pool_size):
+            pixels = bytearray(width * height * 3)
+            self.free.put((pixels, pygame.image.frombuffer(pixels, size, 'RGB')))
+        # (frame number, buffer) for the encoder, None to stop. Never holds
+        # more than the pool, so queueing a frame never waits.
+        self.frames = queue.Queue(maxsize=pool_size)
+        self.captured = 0
+        self.dropped = 0
+        self.error = None
+        self.encoder = threading.Thread(target=self.encode_frames, name='capture', daemon=True)
+        self.encoder.start()
+
+    def capture(self, screen, wait=False):
+        # Queue a copy of `screen` for encoding. Returns False if the frame
+        # was skipped because every buffer is busy; with `wait` it waits for
+        # one instead, for offline rendering where no frame may be lost.
+        try:
+            buffer = self.free.get(block=wait)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        buffer[1].blit(screen, (0, 0))
+        self.frames.put_nowait((self.captured, buffer))
+        self.captured += 1
+        return True
+
+    def close(self):
+        # Encode every queued frame and finish the output
+        if not self.encoder.is_alive():
+            return
+        self.frames.put(None)
+        self.encoder.join()
+        if self.file is not None:
+            self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def encode_frames(self):
+        # Encoder thread. Writing and zlib both release the GIL, so the game
+        # loop keeps running while a frame is encoded.
+        width, height = self.size
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            number, buffer = frame
+            if self.error is None:
+                try:
+                    if self.raw:
+                        self.file.write(buffer[0])
+                    else:
+                        with open(os.path.join(self.path, f'frame-{number:06d}.png'), 'wb') as file:
+                            file.write(png(buffer[0], width, height))
+                except OSError as error:
+                    # Reported by close(); the game keeps running meanwhile
+                    self.error = error
+            self.free.put(buffer)
+
+
+def png(pixels, width, height, level=PNG_LEVEL):
+    # PNG file of 8-bit RGB `pixels`, rows top to bottom
+    stride = width * 3
+    view = memoryview(pixels)
+    rows = bytearray()
+    for y in range(height):
+        rows += b'\0'  # No filter
+        rows += view[y * stride:(y + 1) * stride]
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return PNG_SIGNATURE + png_chunk(b'IHDR', header) + png_chunk(b'IDAT', zlib.compress(rows, level)) + png_chunk(b'IEND', b'')
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)))
+
+
+def export(recording, path, fps=TICK_RATE, seek=0):
+    # Render `recording` from tick `seek` to the end, one frame every
+    # TICK_RATE / fps ticks, as main.py would draw it. Returns the capture.
+    from hud import Hud
+    from replay import Player
+    from sprites import build_atlas
+
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    player = Player(recording)
+    game = player.seek(seek)
+    game.level.build_layers()
+    build_atlas()
+    hud = Hud()
+    camera = Camera(game.level, SCREEN_WIDTH, SCREEN_HEIGHT)
+    capture = FrameCapture(path, screen.get_size())
+    start = game.ticks
+    ticks_per_frame = TICK_RATE / fps
+    try:
+        frame = 0
+        done = False
+        while not done:
+            # Catch up to this frame's tick
+            while not done and game.ticks < start + frame * ticks_per_frame:
+                done = player.step()
+            offset = camera.follow(game.pacman)
+            screen.fill('black')
+            game.level.draw(screen, offset)
+            for sprite in camera.visible([game.pacman] + game.ghosts):
+                sprite.draw(screen, 1.0, offset)
+            hud.draw(screen, game.pacman)
+            capture.capture(screen, wait=True)
+            frame += 1
+    finally:
+        capture.close()
+    return capture
+
+
+if __name__ == "__main__":
+    # No window needed
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from replay import Recording
+
+    parser = argparse.ArgumentParser(description="Render a recorded game to a PNG sequence or raw video")
+    parser.add_argument('recording')
+    parser.add_argument('output', help=f"directory for PNG frames, or a {' or '.join(RAW_EXTENSIONS)} file")
+    parser.add_argument('--fps', type=float, default=TICK_RATE, help="frames per second of game time")
+    parser.add_argument('--seek', type=int, default=0, metavar='TICK', help="start at this tick")
+    parser.add_argument('--level', help="level file to use instead of the recorded path")
+    args = parser.parse_args()
+
+    pygame.init()
+    capture = export(Recording.load(args.recording, args.level), args.output, args.fps, args.seek)
+    print(f"{capture.captured} frames of {SCREEN_WIDTH}x{SCREEN_HEIGHT} written to {args.output}")
@@ -0,0 +1,30 @@
+from constants import CELL_SIZE
+
+# Pacman/ghost collisions, found in one pass once everything has moved for
+# the tick. Pacman's occupancy is just the cells he swept this tick (where
+# he was and where he is), so each ghost is one lookup against those rather
+# than a test against every other sprite: the cost grows with the number of
+# ghosts, never with pairs of them.
+#
+# Sharing a cell at the end of the tick is a collision, as it always was.
+# So is swapping cells: a ghost and Pacman heading towards each other can
+# cross the boundary between two cells in the same tick, and would pass
+# straight through each other if only the end positions were compared.
+
+
+def previous_cell(sprite):
+    # Cell a sprite was in before this tick. A sprite's grid position is
+    # always the cell its pixel position falls in.
+    return int(sprite.prev_pixel_x // CELL_SIZE), int(sprite.prev_pixel_y // CELL_SIZE)
+
+
+def collisions(pacman, ghosts):
+    # The ghosts that ran into Pacman this tick, in order
+    grid_x, grid_y = pacman.grid_x, pacman.grid_y
+    from_x, from_y = previous_cell(pacman)
+    if from_x == grid_x and from_y == grid_y:
+        # Pacman stayed in his cell, so there is nothing to swap with
+        return [ghost for ghost in ghosts if ghost.grid_x == grid_x and ghost.grid_y == grid_y]
+    return [ghost for ghost in ghosts
+            if (ghost.grid_x == grid_x and ghost.grid_y == grid_y)
+            or (ghost.grid_x == from_x and ghost.grid_y == from_y and previous_cell(ghost) == (grid_x, grid_y))]
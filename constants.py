@@ -1,7 +1,13 @@
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
+FPS = 60  # Default render rate, frames per second
+# Game logic runs at a fixed rate whatever the render rate; every speed and
+# timer in the game is per tick
+TICK_RATE = 60
 CELL_SIZE = 20
+# Points for collecting a dot or power pellet
+DOT_POINTS = 10
+POWERUP_POINTS = 50
 
 
 
@@ -0,0 +1,31 @@
+# Directions are small integers so movement and ghost AI index lookup tables
+# instead of comparing strings. NONE is 0, so `if direction:` still means
+# "moving". The names are only for the input boundary (keyboard, scripted
+# inputs, replay files) and debugging.
+#
+# The order right, up, left, down matters: ghosts keep the first of several
+# equally good exits.
+
+NONE = 0
+RIGHT = 1
+UP = 2
+LEFT = 3
+DOWN = 4
+
+ALL = (RIGHT, UP, LEFT, DOWN)
+NAMES = (None, 'right', 'up', 'left', 'down')
+CODES = {name: code for code, name in enumerate(NAMES)}
+
+# Indexed by direction
+DX = (0, 1, 0, -1, 0)
+DY = (0, 0, -1, 0, 1)
+OPPOSITE = (NONE, LEFT, DOWN, RIGHT, UP)
+# Pacman sprite rotation in degrees
+ROTATION = (0, 0, 90, 180, 270)
+# Moving right or down, the far edge of the sprite enters the next cell first
+FAR_EDGE = (False, True, False, False, True)
+
+
+def code(direction):
+    # Direction code for a name, a code, or None (no direction)
+    return CODES.get(direction, direction)
@@ -0,0 +1,83 @@
+from bisect import bisect_right
+from constants import TICK_RATE
+from directions import DX, DY
+
+# Ghost targeting shared by all the ghosts of a game. Once per tick, before
+# the ghosts move, update() works out everything their targets depend on:
+# Pacman's cell and the tiles ahead of him, where Blinky really is, and
+# whether the ghosts are scattering or chasing. A ghost deciding at an
+# intersection then just looks its target up, so the per-ghost cost stays
+# flat however many ghosts there are.
+#
+# Chase targets, by ghost type:
+#   blinky  Pacman's cell
+#   pinky   4 tiles ahead of Pacman
+#   inky    2 tiles ahead of Pacman, plus the vector from Blinky to there
+#   clyde   Pacman's cell while more than 8 tiles away, else his corner
+# While scattering every ghost heads for its own corner instead. Scared and
+# eaten ghosts are handled by the ghost itself (random targets, home).
+
+# Lengths in seconds of the alternating scatter and chase phases from the
+# start of a game, scatter first. After the last one the ghosts chase for
+# good.
+PHASES = (7, 20, 7, 20, 5, 20, 5)
+# Tick at which each phase ends
+PHASE_ENDS = tuple(sum(PHASES[:i + 1]) * TICK_RATE for i in range(len(PHASES)))
+
+CLYDE_SHY_DISTANCE = 8
+
+
+def scattering(ticks):
+    # Whether the ghosts are in a scatter phase `ticks` into a game
+    return bisect_right(PHASE_ENDS, ticks) % 2 == 0 and ticks < PHASE_ENDS[-1]
+
+
+def scatter_corners(width, height):
+    # Ghost type -> the corner cell it heads for while scattering
+    return {
+        'blinky': (width - 2, 1),
+        'pinky': (1, 1),
+        'inky': (width - 2, height - 2),
+        'clyde': (1, height - 2),
+    }
+
+
+class GhostDirector:
+    def __init__(self, level, pacman, ghosts):
+        self.pacman = pacman
+        # Inky's target is relative to the first Blinky, if there is one
+        self.blinky = next((ghost for ghost in ghosts if ghost.ghost_type == 'blinky'), None)
+        self.corners = scatter_corners(level.width, level.height)
+        self.scatter = True
+        self.targets = self.corners
+        for ghost in ghosts:
+            ghost.director = self
+
+    def update(self, ticks):
+        # Targets for this tick, `ticks` into the game
+        self.scatter = scattering(ticks)
+        if self.scatter:
+            self.targets = self.corners
+            return
+
+        pacman = self.pacman
+        x, y = pacman.grid_x, pacman.grid_y
+        dx, dy = DX[pacman.direction], DY[pacman.direction]
+        ahead_x, ahead_y = x + 2 * dx, y + 2 * dy
+        blinky_x, blinky_y = (self.blinky.grid_x, self.blinky.grid_y) if self.blinky else (x, y)
+        self.targets = {
+            'blinky': (x, y),
+            'pinky': (x + 4 * dx, y + 4 * dy),
+            'inky': (2 * ahead_x - blinky_x, 2 * ahead_y - blinky_y),
+            'clyde': (x, y),
+        }
+
+    def target(self, ghost):
+        # Chase or scatter target for `ghost`, or None for a ghost type
+        # without one
+        target = self.targets.get(ghost.ghost_type)
+        if ghost.ghost_type == 'clyde' and not self.scatter:
+            x, y = target
+            if (ghost.grid_x - x) ** 2 + (ghost.grid_y - y) ** 2 <= CLYDE_SHY_DISTANCE ** 2:
+                return self.corners['clyde']
+        return target
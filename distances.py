@@ -0,0 +1,182 @@
+import os
+import sys
+import zlib
+from array import array
+from collections import deque
+
+# Shortest-path distances through the maze, for ghost targeting.
+#
+# Every walkable cell gets a dense index and distances are kept as unsigned
+# 16-bit steps, one row per target cell. Small levels use a single flat
+# count x count matrix whose rows are filled by BFS the first time a target
+# is asked for (or all at once by compute_all()); large custom mazes where
+# that matrix would be too big keep only the rows that were actually used.
+# A complete matrix can be saved next to the level file and is picked up
+# automatically the next time the level loads.
+
+UNREACHABLE = 0xFFFF
+# Above this many walkable cells (8 MiB of matrix) rows are kept lazily
+FULL_MATRIX_LIMIT = 2048
+
+FILE_MAGIC = b'PACD'
+FILE_VERSION = 1
+
+
+# Tables are static per maze, so every Level with the same layout shares one
+_shared_tables = {}
+
+
+def distance_file(level_file):
+    return os.path.splitext(level_file)[0] + '.dist'
+
+
+class DistanceTable:
+    def __init__(self, level):
+        self.width = level.width
+        self.height = level.height
+        self.walkable = level.walkable
+        # Dense index of every walkable cell, -1 for walls
+        self.index = array('i', [-1]) * (self.width * self.height)
+        self.cells = array('i')
+        for cell, walkable in enumerate(level.walkable):
+            if walkable:
+                self.index[cell] = len(self.cells)
+                self.cells.append(cell)
+        self.count = len(self.cells)
+        self.checksum = zlib.crc32(level.walkable)
+
+        self.lazy = self.count > FULL_MATRIX_LIMIT
+        if self.lazy:
+            self.rows = {}
+        else:
+            self.matrix = array('H', [UNREACHABLE]) * (self.count * self.count)
+            self.computed = bytearray(self.count)
+
+    def bfs(self, target):
+        # Distances from every walkable cell to the target, by dense index
+        width, height = self.width, self.height
+        walkable, index = self.walkable, self.index
+        row = array('H', [UNREACHABLE]) * self.count
+        row[index[target]] = 0
+        queue = deque([target])
+        while queue:
+            cell = queue.popleft()
+            distance = row[index[cell]] + 1
+            x, y = cell % width, cell // width
+            for next_cell, ok in ((cell + 1, x + 1 < width), (cell - width, y > 0),
+                                  (cell - 1, x > 0), (cell + width, y + 1 < height)):
+                if ok and walkable[next_cell]:
+                    next_index = index[next_cell]
+                    if row[next_index] == UNREACHABLE:
+                        row[next_index] = distance
+                        queue.append(next_cell)
+        return row
+
+    def row(self, target_x, target_y):
+        # Distances to a target cell indexed by dense cell index, or None
+        # when the target is off the grid or inside a wall
+        if not (0 <= target_x < self.width and 0 <= target_y < self.height):
+            return None
+        target = target_y * self.width + target_x
+        target_index = self.index[target]
+        if target_index < 0:
+            return None
+
+        if self.lazy:
+            row = self.rows.get(target_index)
+            if row is None:
+                row = self.rows[target_index] = self.bfs(target)
+            return row
+
+        start = target_index * self.count
+        if not self.computed[target_index]:
+            self.matrix[start:start + self.count] = self.bfs(target)
+            self.computed[target_index] = 1
+        return memoryview(self.matrix)[start:start + self.count]
+
+    def distance(self, x, y, target_x, target_y):
+        # Maze distance in steps, or None if either cell isn't walkable or
+        # there is no path
+        row = self.row(target_x, target_y)
+        if row is None or not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        cell_index = self.index[y * self.width + x]
+        if cell_index < 0 or row[cell_index] == UNREACHABLE:
+            return None
+        return row[cell_index]
+
+    def compute_all(self):
+        if self.lazy:
+            raise ValueError(f"{self.count} walkable cells is too many for a full distance matrix")
+        for target_index, target in enumerate(self.cells):
+            if not self.computed[target_index]:
+                start = target_index * self.count
+                self.matrix[start:start + self.count] = self.bfs(target)
+                self.computed[target_index] = 1
+
+    def save(self, path):
+        self.compute_all()
+        matrix = self.matrix
+        if sys.byteorder == 'big':
+            matrix = array('H', matrix)
+            matrix.byteswap()
+        header = array('I', [FILE_VERSION, self.width, self.height, self.count, self.checksum])
+        if sys.byteorder == 'big':
+            header.byteswap()
+        with open(path, 'wb') as file:
+            file.write(FILE_MAGIC)
+            file.write(header.tobytes())
+            file.write(matrix.tobytes())
+
+    def load(self, path):
+        # Fill the matrix from a saved file. Returns False (and leaves the
+        # table untouched) if the file is missing or was built for a
+        # different maze.
+        if self.lazy or not os.path.exists(path):
+            return False
+        with open(path, 'rb') as file:
+            if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                return False
+            header = array('I')
+            header.frombytes(file.read(header.itemsize * 5))
+            if sys.byteorder == 'big':
+                header.byteswap()
+            if list(header) != [FILE_VERSION, self.width, self.height, self.count, self.checksum]:
+                return False
+            matrix = array('H')
+            matrix.frombytes(file.read())
+        if len(matrix) != self.count * self.count:
+            return False
+        if sys.byteorder == 'big':
+            matrix.byteswap()
+        self.use_matrix(matrix)
+        return True
+
+    def use_matrix(self, matrix):
+        # Adopt a complete, native byte order matrix. Any buffer of uint16
+        # works, including a read-only memoryview into a mapped file.
+        if len(matrix) != self.count * self.count:
+            raise ValueError(f"Distance matrix has {len(matrix)} entries, expected {self.count * self.count}")
+        self.matrix = matrix
+        self.computed = bytearray(b'\x01') * self.count
+
+
+def shared_table(level, level_file):
+    # The distance table for this maze layout, loading the saved matrix next
+    # to the level file the first time the layout is seen
+    key = (level.width, level.height, bytes(level.walkable))
+    table = _shared_tables.get(key)
+    if table is None:
+        table = _shared_tables[key] = DistanceTable(level)
+        table.load(distance_file(level_file))
+    return table
+
+
+if __name__ == "__main__":
+    # Precompute and save the distance matrix for one or more level files
+    from level import Level
+    for level_file in sys.argv[1:]:
+        table = Level(level_file).distances
+        path = distance_file(level_file)
+        table.save(path)
+        print(f"{path}: {table.count} cells, {os.path.getsize(path)} bytes")
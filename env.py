@@ -0,0 +1,96 @@
+import numpy as np
+from constants import CELL_SIZE
+from directions import NAMES
+from game import GameState, LEVEL_FILE
+from levelcache import DOT, POWERUP
+from rollout import MAX_TICKS
+
+# Gym-style environment for training agents: reset() -> (observation, info)
+# and step(action) -> (observation, reward, terminated, truncated, info),
+# without depending on gym itself. Actions are direction codes, 0 (keep
+# going) and 1..4 for right, up, left, down; reward is the score gained.
+#
+# Observations are preallocated once and rewritten in place every step, so
+# the array returned is always the same object:
+#   'grid'    uint8 (channels, height, width), one 0/1 plane per CHANNELS
+#             entry. Static walls are filled once; dots and pellets are
+#             read straight from the level's item bytes.
+#   'pixels'  uint8 (height, width, 3) RGB, the same picture main.py
+#             draws (without the HUD). The array is the pixel memory of
+#             the surface the game is drawn on, so no frame is ever copied.
+
+CHANNELS = ('walls', 'dots', 'pellets', 'pacman', 'blinky', 'pinky', 'inky', 'clyde', 'vulnerable')
+ACTIONS = len(NAMES)
+
+
+class PacmanEnv:
+    def __init__(self, level_file=LEVEL_FILE, seed=None, observation='grid', max_ticks=MAX_TICKS):
+        if observation not in ('grid', 'pixels'):
+            raise ValueError(f"observation must be 'grid' or 'pixels', not {observation!r}")
+        self.game = GameState(level_file, seed=seed)
+        self.observation_mode = observation
+        self.max_ticks = max_ticks
+        level = self.game.level
+        width, height = level.width, level.height
+
+        if observation == 'grid':
+            self.observation = np.zeros((len(CHANNELS), height, width), dtype=np.uint8)
+            # name -> view of one plane of self.observation
+            self.channels = dict(zip(CHANNELS, self.observation))
+            walkable = np.frombuffer(level.walkable, dtype=np.uint8).reshape(height, width)
+            np.equal(walkable, 0, out=self.channels['walls'], casting='unsafe')
+            # Shares memory with level.items, which is only ever updated in place
+            self.items = np.frombuffer(level.items, dtype=np.uint8).reshape(height, width)
+        else:
+            import pygame
+            self.observation = np.zeros((height * CELL_SIZE, width * CELL_SIZE, 3), dtype=np.uint8)
+            # A surface drawing straight into the observation array. A
+            # surfarray view would lock the surface and block the next blit.
+            self.surface = pygame.image.frombuffer(self.observation, (width * CELL_SIZE, height * CELL_SIZE), 'RGB')
+            level.build_layers()
+
+    def reset(self, seed=None):
+        # Without a seed the game starts over from the one it already has,
+        # so PacmanEnv(seed=0) gives the same episode on every reset
+        self.game.reset(self.game.seed if seed is None else seed)
+        return self.observe(), self.info()
+
+    def step(self, action):
+        game = self.game
+        score = game.pacman.score
+        terminated = game.step(action)
+        truncated = not terminated and self.max_ticks is not None and game.ticks >= self.max_ticks
+        return self.observe(), game.pacman.score - score, terminated, truncated, self.info()
+
+    def info(self):
+        game = self.game
+        return {'score': game.pacman.score, 'lives': game.pacman.lives, 'ticks': game.ticks,
+                'complete': game.complete}
+
+    def observe(self):
+        if self.observation_mode == 'pixels':
+            return self.render()
+        channels = self.channels
+        np.equal(self.items, DOT, out=channels['dots'], casting='unsafe')
+        np.equal(self.items, POWERUP, out=channels['pellets'], casting='unsafe')
+
+        pacman = self.game.pacman
+        channels['pacman'].fill(0)
+        channels['pacman'][pacman.grid_y, pacman.grid_x] = 1
+        vulnerable = channels['vulnerable']
+        vulnerable.fill(0)
+        for ghost in self.game.ghosts:
+            plane = channels[ghost.ghost_type]
+            plane.fill(0)
+            plane[ghost.grid_y, ghost.grid_x] = 1
+            if ghost.vulnerable:
+                vulnerable[ghost.grid_y, ghost.grid_x] = 1
+        return self.observation
+
+    def render(self):
+        game = self.game
+        game.level.draw(self.surface)
+        game.pacman.draw(self.surface)
+        for ghost in game.ghosts:
+            ghost.draw(self.surface)
+        return self.observation
@@ -0,0 +1,206 @@
+import random
+from array import array
+from collections import namedtuple
+from collisions import collisions
+from constants import CELL_SIZE
+from director import GhostDirector
+from directions import NONE, LEFT, code
+from level import Level
+from telemetry import DEATH, LEVEL_COMPLETE, GAME_OVER
+from pacman import Pacman
+from ghost import Ghost
+
+# Headless game rules. Nothing here touches pygame, so a GameState can be
+# stepped as fast as Python allows (batch evaluation, agents, tests) and the
+# windowed loop in main.py drives exactly the same code.
+
+LEVEL_FILE = 'levels/level1.txt'
+PACMAN_START = (8, 14)
+GHOST_STARTS = [
+    (13, 11, 'blinky'),  # Red ghost - direct chaser
+    (14, 11, 'pinky'),   # Pink ghost - ambusher
+    (13, 12, 'inky'),    # Cyan ghost - unpredictable
+    (14, 12, 'clyde')    # Orange ghost - random
+]
+
+# Everything that changes during a game. The static maze is not part of it,
+# so snapshots are small and restoring one never touches the Level grid.
+Snapshot = namedtuple('Snapshot', ['ticks', 'complete', 'game_over', 'rng_state',
+                                   'items', 'pacman', 'ghosts'])
+
+
+def pack_rng_state(state):
+    # random.Random state as (version, bytes, gauss_next). The Mersenne
+    # Twister's 624 key words and position are 625 Python ints otherwise,
+    # ~20 KB per snapshot; as 32-bit words they are 2.5 KB.
+    version, internal, gauss_next = state
+    return version, array('I', internal).tobytes(), gauss_next
+
+
+def unpack_rng_state(packed):
+    version, internal, gauss_next = packed
+    return version, tuple(array('I', internal)), gauss_next
+
+
+class GameState:
+    def __init__(self, level_file=LEVEL_FILE, seed=None, level=None):
+        # An already loaded `level` can be passed in to skip reading the file.
+        # `seed` fixes the ghosts' random targets so a game can be replayed.
+        self.level = level if level is not None else Level(level_file)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Optional profiler.Profiler timing the phases of step()
+        self.profiler = None
+        # Optional telemetry.Telemetry recording the game's events, see log_to()
+        self.telemetry = None
+        self.new_game()
+
+    def new_game(self):
+        self.pacman = Pacman(PACMAN_START[0], PACMAN_START[1], self.level)
+        self.pacman.telemetry = self.telemetry
+        self.ghosts = [Ghost(x, y, self.level, ghost_type, self.pacman, self.rng)
+                       for x, y, ghost_type in GHOST_STARTS]
+        self.director = GhostDirector(self.level, self.pacman, self.ghosts)
+        self.ticks = 0
+        self.complete = False
+        self.game_over = False
+
+    def reset(self, seed=None):
+        # Start over on the same level without reloading it
+        self.level.reset()
+        self.seed = seed
+        self.rng.seed(seed)
+        self.new_game()
+
+    def snapshot(self):
+        return Snapshot(self.ticks, self.complete, self.game_over, pack_rng_state(self.rng.getstate()),
+                        bytes(self.level.items), self.pacman.get_state(),
+                        tuple([ghost.get_state() for ghost in self.ghosts]))
+
+    def restore(self, snapshot):
+        # Rewind this game to a snapshot taken from it (or from a clone)
+        self.ticks = snapshot.ticks
+        self.complete = snapshot.complete
+        self.game_over = snapshot.game_over
+        self.rng.setstate(unpack_rng_state(snapshot.rng_state))
+        self.level.restore(snapshot.items)
+        self.pacman.set_state(snapshot.pacman)
+        for ghost, state in zip(self.ghosts, snapshot.ghosts):
+            ghost.set_state(state)
+
+    def clone(self):
+        # An independent game in the same state, sharing the static maze
+        game = GameState(level=self.level.copy())
+        game.seed = self.seed
+        game.restore(self.snapshot())
+        return game
+
+    def log_to(self, telemetry):
+        # Record this game's events (items, ghosts eaten, deaths, the end)
+        # in a telemetry.Telemetry from now on; None stops recording
+        self.telemetry = self.level.telemetry = self.pacman.telemetry = telemetry
+
+    @property
+    def done(self):
+        return self.complete or self.game_over
+
+    def step(self, action=None):
+        # Advance the game by one tick. `action` is a direction (a
+        # directions code, or a name such as 'right') queued as the next
+        # turn, or None/NONE to keep the current input. Returns True once the
+        # game has ended.
+        if self.done:
+            return True
+        if action:
+            self.pacman.queued_direction = code(action)
+
+        pacman = self.pacman
+        level = self.level
+        profiler = self.profiler
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.begin_tick(self.seed, self.ticks)
+        if profiler is not None:
+            start = profiler.start()
+
+        # Remember where everyone was so rendering can interpolate
+        pacman.prev_pixel_x = pacman.pixel_x
+        pacman.prev_pixel_y = pacman.pixel_y
+        for ghost in self.ghosts:
+            ghost.prev_pixel_x = ghost.pixel_x
+            ghost.prev_pixel_y = ghost.pixel_y
+
+        pacman.move()
+        pacman.animate()
+        if profiler is not None:
+            start = profiler.record('pacman.move', start)
+
+        # Check if power pellet was eaten
+        if level.power_pellet_eaten:
+            for ghost in self.ghosts:
+                ghost.make_vulnerable()
+            level.power_pellet_eaten = False
+
+        # Targets for every ghost, from where everyone is before they move
+        self.director.update(self.ticks)
+        ghosts = self.ghosts
+        for ghost in ghosts:
+            ghost.move()
+        if profiler is not None:
+            start = profiler.record('ghost.move', start)
+
+        # One collision pass once everyone has moved
+        for ghost in collisions(pacman, ghosts):
+            ghost.meet_pacman()
+        if profiler is not None:
+            start = profiler.record('collisions', start)
+
+        for ghost in ghosts:
+            ghost.update()
+        if profiler is not None:
+            profiler.record('ghost.update', start)
+
+        self.ticks += 1
+
+        # Check if level is complete (all dots and power pellets eaten)
+        if level.is_complete():
+            self.complete = True
+            if telemetry is not None:
+                telemetry.record(LEVEL_COMPLETE, pacman.grid_x, pacman.grid_y, pacman.score)
+            return True
+
+        if pacman.dead:
+            pacman.lives -= 1
+            if telemetry is not None:
+                telemetry.record(DEATH, pacman.grid_x, pacman.grid_y, pacman.lives)
+            if pacman.lives <= 0:
+                self.game_over = True
+                if telemetry is not None:
+                    telemetry.record(GAME_OVER, pacman.grid_x, pacman.grid_y, pacman.score)
+                return True
+            self.reset_positions()
+        return False
+
+    def reset_positions(self):
+        # Put everyone back on their start cells after Pacman loses a life
+        pacman = self.pacman
+        pacman.grid_x, pacman.grid_y = PACMAN_START
+        pacman.pixel_x = pacman.grid_x * CELL_SIZE
+        pacman.pixel_y = pacman.grid_y * CELL_SIZE
+        pacman.prev_pixel_x = pacman.pixel_x
+        pacman.prev_pixel_y = pacman.pixel_y
+        pacman.direction = NONE
+        pacman.queued_direction = NONE
+        pacman.dead = False
+        pacman.ghost_score_multiplier = 1
+
+        for ghost, (x, y, _) in zip(self.ghosts, GHOST_STARTS):
+            ghost.grid_x = x
+            ghost.grid_y = y
+            ghost.pixel_x = x * CELL_SIZE
+            ghost.pixel_y = y * CELL_SIZE
+            ghost.prev_pixel_x = ghost.pixel_x
+            ghost.prev_pixel_y = ghost.pixel_y
+            ghost.direction = LEFT
+            ghost.vulnerable = False
+            ghost.returning_home = False
@@ -0,0 +1,44 @@
+import pygame
+from constants import SCREEN_WIDTH
+
+# Score and lives display. The font is resolved once, and rendered text is
+# memoized: the score is assembled from cached per-digit glyphs and the
+# lives counter is cached per value, so a frame where nothing changed does
+# no font rendering at all.
+
+
+class Hud:
+    def __init__(self, font_name='Arial', font_size=24, color='white'):
+        self.font = pygame.font.SysFont(font_name, font_size)
+        self.color = color
+        self.glyphs = {}  # single character -> Surface
+        self.texts = {}   # whole string -> Surface
+
+    def glyph(self, char):
+        surface = self.glyphs.get(char)
+        if surface is None:
+            surface = self.glyphs[char] = self.font.render(char, True, self.color)
+        return surface
+
+    def text(self, text):
+        surface = self.texts.get(text)
+        if surface is None:
+            surface = self.texts[text] = self.font.render(text, True, self.color)
+        return surface
+
+    def draw_number(self, screen, label, value, pos):
+        # Blit a cached label followed by one cached glyph per digit and
+        # return the area covered
+        x, y = pos
+        rect = screen.blit(self.text(label), (x, y))
+        x = rect.right
+        for char in str(value):
+            x = screen.blit(self.glyph(char), (x, y)).right
+        rect.width = x - rect.x
+        return rect
+
+    def draw(self, screen, pacman):
+        # Returns the rects drawn so a dirty-rect renderer can update them
+        score_rect = self.draw_number(screen, 'Score: ', pacman.score, (10, 10))
+        lives_rect = screen.blit(self.text(f'Lives: {pacman.lives}'), (SCREEN_WIDTH - 100, 10))
+        return [score_rect, lives_rect]
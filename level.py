@@ -1,16 +1,154 @@
-import pygame
-from constants import CELL_SIZE
+from collections import OrderedDict
+from constants import CELL_SIZE, DOT_POINTS, POWERUP_POINTS
+from directions import NONE, ALL, DX, DY, OPPOSITE
+from distances import shared_table
+from levelcache import load_compiled, DOT, POWERUP
+from telemetry import DOT_EATEN, PELLET_EATEN
 # Key
 # S = Start
 # . = Dot
 # P = Powerup
 # W = Wall
+
+# The maze is pre-rendered in square chunks of this many cells, built the
+# first time they are on screen. Only the most recently drawn MAX_CHUNKS are
+# kept, so memory depends on the screen size rather than the maze size.
+CHUNK_CELLS = 16
+CHUNK_SIZE = CHUNK_CELLS * CELL_SIZE
+MAX_CHUNKS = 64
+
+def build_exits(walkable, width, height):
+    # Per cell, the (direction, x, y) of each walkable neighbour
+    exits = []
+    for y in range(height):
+        for x in range(width):
+            cell_exits = []
+            if walkable[y * width + x]:
+                for direction in ALL:
+                    next_x, next_y = x + DX[direction], y + DY[direction]
+                    if 0 <= next_x < width and 0 <= next_y < height and walkable[next_y * width + next_x]:
+                        cell_exits.append((direction, next_x, next_y))
+            exits.append(tuple(cell_exits))
+    return exits
+
+def build_turns(exits):
+    # Per cell, indexed by the direction a ghost arrives moving in, the exits
+    # it may take: every exit except straight back, or only straight back at
+    # a dead end. In corridors and corners that leaves a single exit, so only
+    # cells with two or more (intersections) need a target to decide.
+    turns = []
+    for cell_exits in exits:
+        cell_turns = []
+        for direction in (NONE,) + ALL:
+            opposite = OPPOSITE[direction]
+            onward = tuple(exit for exit in cell_exits if exit[0] != opposite)
+            cell_turns.append(onward or tuple(exit for exit in cell_exits if exit[0] == opposite))
+        turns.append(tuple(cell_turns))
+    return turns
+
+def unpickle_level(level_file, use_cache, items, power_pellet_eaten):
+    # Rebuild a pickled Level
+    level = Level(level_file, use_cache)
+    level.restore(items)
+    level.power_pellet_eaten = power_pellet_eaten
+    return level
+
+
 class Level:
-    def __init__(self, level_file):
-        self.dots = {}
-        self.powerups = {}
-        self.level = self.load_level(level_file)
+    def __init__(self, level_file, use_cache=True):
+        # Static maze data normally comes from the compiled level cache (see
+        # levelcache.py) and is shared with every other Level of the same
+        # file; use_cache=False parses the text file directly
+        self.level_file = level_file
+        self.use_cache = use_cache
+        compiled = load_compiled(level_file) if use_cache else None
+        if compiled is not None:
+            self.level = compiled.level
+            self.width = compiled.width
+            self.height = compiled.height
+            self.walkable = compiled.walkable
+            self.exits = compiled.exits
+            self.turns = compiled.turns
+            self.distances = compiled.distances
+            self.initial_items = compiled.items
+        else:
+            self.level = self.load_level(level_file)
+            self.width = len(self.level[0])
+            self.height = len(self.level)
+            self.walkable, self.exits = self.build_walkability()
+            self.turns = build_turns(self.exits)
+            self.initial_items = self.build_items()
+            # Maze distances for ghost targeting, shared by every Level with
+            # this layout and read from disk if precomputed
+            self.distances = shared_table(self, level_file)
+        # Dots and power pellets still on the board, one byte per cell
+        # (DOT or POWERUP), plus how many of each are left
+        self.items = bytearray(self.initial_items)
+        self.dots_left = self.items.count(DOT)
+        self.powerups_left = self.items.count(POWERUP)
+        self.power_pellet_eaten = False
+        # Pre-rendered chunks, (chunk x, chunk y) -> Surface, in least
+        # recently drawn order. None until the first draw so a headless Level
+        # never needs pygame. layers_version changes whenever they are
+        # thrown away, so renderers know to redraw everything.
+        self.chunks = None
+        self.layers_version = 0
+        # Cells erased from the chunks since a renderer last looked, so a
+        # dirty-rect renderer can push just those to the display
+        self.cleared_cells = []
+        # Optional telemetry.Telemetry told about every item collected
+        self.telemetry = None
+
+    @property
+    def dots(self):
+        return [(cell % self.width, cell // self.width) for cell, item in enumerate(self.items) if item == DOT]
+
+    @property
+    def powerups(self):
+        return [(cell % self.width, cell // self.width) for cell, item in enumerate(self.items) if item == POWERUP]
+
+    def copy(self):
+        # A Level for another game on the same maze: the static grid, exits
+        # and distances are shared, only the item state is copied
+        level = Level.__new__(Level)
+        level.__dict__.update(self.__dict__)
+        level.items = bytearray(self.items)
+        level.chunks = None
+        level.cleared_cells = []
+        level.telemetry = None
+        return level
+
+    def __deepcopy__(self, memo):
+        # The static data is read-only (and partly mapped from the level
+        # cache, which can't be copied), so deep copies share it like copy()
+        return self.copy()
+
+    def __reduce__(self):
+        # Pickled by file and item state; unpickling loads the level again,
+        # from the cache if it was loaded from there
+        return (unpickle_level, (self.level_file, self.use_cache, bytes(self.items), self.power_pellet_eaten))
+
+    def reset(self):
+        # Put every dot and power pellet back for a new game
+        self.restore(self.initial_items)
+
+    def snapshot(self, buffer=None):
+        # Copy the item state into `buffer` (a bytearray the size of the
+        # grid) and return it. Reusing one buffer allocates nothing.
+        if buffer is None:
+            buffer = bytearray(len(self.items))
+        buffer[:] = self.items
+        return buffer
+
+    def restore(self, snapshot):
+        # Bring back the items from a snapshot, in place
+        self.items[:] = snapshot
+        self.dots_left = self.items.count(DOT)
+        self.powerups_left = self.items.count(POWERUP)
         self.power_pellet_eaten = False
+        self.cleared_cells.clear()
+        if self.chunks is not None:
+            self.build_layers()
 
     def load_level(self, level_file):
         level = []
@@ -22,46 +160,136 @@ class Level:
                 if stripped_line:  
                     if len(stripped_line) != line_length:
                         raise ValueError(f"Line length mismatch: {len(stripped_line)} != {line_length}")
-                    row = []
-                    for x, char in enumerate(stripped_line):
-                        if char == '.':
-                            self.dots[(x, y)] = True
-                        elif char == 'P':
-                            self.powerups[(x, y)] = True
-                        row.append(char)
-                    level.append(row)
+                    level.append(list(stripped_line))
         return level
 
-    # will be called every frame
-    def draw(self, screen):
+    def build_items(self):
+        items = bytearray(self.width * self.height)
         for y, row in enumerate(self.level):
             for x, char in enumerate(row):
-                if char == 'W':
-                    pygame.draw.rect(screen, 'blue',(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
-        
-        for (x, y) in self.dots:
-            pygame.draw.circle(screen, 'yellow', (x * CELL_SIZE + CELL_SIZE / 2, y * CELL_SIZE + CELL_SIZE / 2), CELL_SIZE / 10)
-        
-        for (x, y) in self.powerups:
-            pygame.draw.circle(screen, 'red', (x * CELL_SIZE + CELL_SIZE / 2, y * CELL_SIZE + CELL_SIZE / 2), CELL_SIZE / 6)
+                if char == '.':
+                    items[y * self.width + x] = DOT
+                elif char == 'P':
+                    items[y * self.width + x] = POWERUP
+        return items
 
+    def build_walkability(self):
+        # Flat row-major bitmap with 1 for every cell that is not a wall, and
+        # per cell the exits to walkable neighbours, so movement checks and
+        # ghost decisions are single lookups
+        width, height = self.width, self.height
+        walkable = bytearray(width * height)
+        for y, row in enumerate(self.level):
+            for x, char in enumerate(row):
+                if char != 'W':
+                    walkable[y * width + x] = 1
+        return walkable, build_exits(walkable, width, height)
+
+    # will be called every frame
+    def draw(self, screen, offset=(0, 0), area=None):
+        # Blit the maze under `area` (a screen rect, default all of it) with
+        # level pixel `offset` at the screen's top left. Only the chunks
+        # overlapping the area are touched.
+        import pygame
+
+        if self.chunks is None:
+            self.build_layers()
+        area = screen.get_rect() if area is None else area.clip(screen.get_rect())
+        offset_x, offset_y = offset
+        first_x = max(0, (area.left + offset_x) // CHUNK_SIZE)
+        first_y = max(0, (area.top + offset_y) // CHUNK_SIZE)
+        last_x = min((self.width - 1) // CHUNK_CELLS, (area.right - 1 + offset_x) // CHUNK_SIZE)
+        last_y = min((self.height - 1) // CHUNK_CELLS, (area.bottom - 1 + offset_y) // CHUNK_SIZE)
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                chunk_rect = pygame.Rect(chunk_x * CHUNK_SIZE - offset_x, chunk_y * CHUNK_SIZE - offset_y,
+                                         CHUNK_SIZE, CHUNK_SIZE)
+                part = chunk_rect.clip(area)
+                screen.blit(self.chunk(chunk_x, chunk_y), part, part.move(-chunk_rect.x, -chunk_rect.y))
+        if area == screen.get_rect():
+            # Everything just went out, nothing is pending any more
+            self.cleared_cells.clear()
+
+    def build_layers(self):
+        # Throw away every pre-rendered chunk; they are drawn again from the
+        # current items as they come into view
+        self.chunks = OrderedDict()
+        self.layers_version += 1
+
+    def chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.chunks.move_to_end(key)
+            return surface
+        surface = self.chunks[key] = self.render_chunk(chunk_x, chunk_y)
+        if len(self.chunks) > MAX_CHUNKS:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def render_chunk(self, chunk_x, chunk_y):
+        # Walls, dots and pellets of one chunk
+        import pygame
+
+        surface = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill('black')
+        first_x, first_y = chunk_x * CHUNK_CELLS, chunk_y * CHUNK_CELLS
+        for y in range(first_y, min(first_y + CHUNK_CELLS, self.height)):
+            row = self.level[y]
+            for x in range(first_x, min(first_x + CHUNK_CELLS, self.width)):
+                left, top = (x - first_x) * CELL_SIZE, (y - first_y) * CELL_SIZE
+                center = (left + CELL_SIZE / 2, top + CELL_SIZE / 2)
+                item = self.items[y * self.width + x]
+                if row[x] == 'W':
+                    pygame.draw.rect(surface, 'blue', (left, top, CELL_SIZE, CELL_SIZE))
+                elif item == DOT:
+                    pygame.draw.circle(surface, 'yellow', center, CELL_SIZE / 10)
+                elif item == POWERUP:
+                    pygame.draw.circle(surface, 'red', center, CELL_SIZE / 6)
+        return surface
+
+    def clear_cell(self, x, y):
+        # Erase a collected item from its chunk, if that chunk is rendered.
+        # Items only sit on open floor, so that is plain black.
+        if self.chunks is not None:
+            surface = self.chunks.get((x // CHUNK_CELLS, y // CHUNK_CELLS))
+            if surface is not None:
+                surface.fill('black', ((x % CHUNK_CELLS) * CELL_SIZE, (y % CHUNK_CELLS) * CELL_SIZE,
+                                       CELL_SIZE, CELL_SIZE))
+            self.cleared_cells.append((x, y))
 
     def is_wall(self, x, y):
         return self.level[y][x] == 'W'
+
+    def is_walkable(self, x, y):
+        # In bounds and not a wall
+        return 0 <= x < self.width and 0 <= y < self.height and self.walkable[y * self.width + x] == 1
     
     def collect_dot(self, x, y):
-        if (x, y) in self.dots:
-            del self.dots[(x, y)]
+        cell = y * self.width + x
+        if 0 <= x < self.width and 0 <= y < self.height and self.items[cell] == DOT:
+            self.items[cell] = 0
+            self.dots_left -= 1
+            self.clear_cell(x, y)
+            if self.telemetry is not None:
+                self.telemetry.record(DOT_EATEN, x, y, DOT_POINTS)
             return True
         return False
     
     def collect_powerup(self, x, y):
-        if (x, y) in self.powerups:
-            del self.powerups[(x, y)]
+        cell = y * self.width + x
+        if 0 <= x < self.width and 0 <= y < self.height and self.items[cell] == POWERUP:
+            self.items[cell] = 0
+            self.powerups_left -= 1
+            self.clear_cell(x, y)
             self.power_pellet_eaten = True
+            if self.telemetry is not None:
+                self.telemetry.record(PELLET_EATEN, x, y, POWERUP_POINTS)
             return True
         return False
         
     def is_complete(self):
         # Check if all dots and power pellets have been collected
-        return len(self.dots) == 0 and len(self.powerups) == 0
\ No newline at end of file
+        return self.dots_left == 0 and self.powerups_left == 0
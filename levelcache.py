@@ -0,0 +1,143 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from distances import DistanceTable
+
+# Compiled level cache. The first time a level file is loaded, its parsed
+# form is written to __levelcache__/ next to it, named after a hash of the
+# file's contents, so editing the text file simply produces a new entry.
+# Later loads map that file read-only: the grid, walkability, initial items and
+# distance matrix are memoryviews straight into the mapping, shared by every
+# Level in the process and, through the OS page cache, by every worker
+# process on the machine.
+#
+# File layout (little-endian):
+#   header      magic, format version, flags, width, height, walkable cells
+#   grid        one byte per cell, the level file's character
+#   walkable    one byte per cell, 1 unless the cell is a wall
+#   items       one byte per cell, DOT, POWERUP or 0
+#   (padding to an even offset)
+#   distances   walkable cells squared uint16, if flags & HAS_DISTANCES
+
+MAGIC = b'PACL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIII')
+HAS_DISTANCES = 1
+DOT = 1
+POWERUP = 2
+CACHE_DIR = '__levelcache__'
+
+# CompiledLevels already mapped in this process, by source hash
+_loaded = {}
+
+
+def cache_path(level_file, digest):
+    return os.path.join(os.path.dirname(level_file), CACHE_DIR, f'{digest}.v{FORMAT_VERSION}.pacl')
+
+
+def compile_level(level_file, path):
+    # Parse the text file and write its compiled form to `path`
+    from level import Level
+    level = Level(level_file, use_cache=False)
+    width, height = level.width, level.height
+
+    grid = ''.join(''.join(row) for row in level.level).encode('ascii', errors='replace')
+
+    table = level.distances
+    flags = 0
+    if not table.lazy:
+        table.compute_all()
+        flags |= HAS_DISTANCES
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a private name and rename into place, so parallel workers
+    # compiling the same level never see a half-written file
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, width, height, table.count))
+        file.write(grid)
+        file.write(bytes(level.walkable))
+        file.write(level.initial_items)
+        if file.tell() % 2:
+            file.write(b'\0')
+        if flags & HAS_DISTANCES:
+            matrix = array('H', table.matrix)
+            if sys.byteorder == 'big':
+                matrix.byteswap()
+            file.write(matrix.tobytes())
+    os.replace(temp_path, path)
+
+
+class CompiledLevel:
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.buffer)
+        magic, version, flags, width, height, count = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} compiled level")
+        self.width = width
+        self.height = height
+
+        size = width * height
+        offset = HEADER.size
+        expected = offset + 3 * size + (3 * size) % 2
+        if flags & HAS_DISTANCES:
+            expected += 2 * count * count
+        if len(view) != expected:
+            raise ValueError(f"{path} is {len(view)} bytes, expected {expected}")
+        self.grid = view[offset:offset + size]
+        self.walkable = view[offset + size:offset + 2 * size]
+        self.items = view[offset + 2 * size:offset + 3 * size]
+        offset += 3 * size + (3 * size) % 2
+
+        # Built once per process and shared by every Level using this file
+        self.level = [list(str(self.grid[y * width:(y + 1) * width], 'ascii')) for y in range(height)]
+        from level import build_exits, build_turns
+        self.exits = build_exits(self.walkable, width, height)
+        self.turns = build_turns(self.exits)
+
+        self.distances = DistanceTable(self)
+        if self.distances.count != count:
+            raise ValueError(f"{path} has {count} walkable cells in its header, grid has {self.distances.count}")
+        if flags & HAS_DISTANCES:
+            matrix = view[offset:offset + 2 * count * count].cast('H')
+            if sys.byteorder == 'big':
+                matrix = array('H', matrix)
+                matrix.byteswap()
+            self.distances.use_matrix(matrix)
+
+
+def load_compiled(level_file):
+    # The CompiledLevel for a level file, compiling it on first use. Returns
+    # None if the cache can't be written (e.g. a read-only checkout), in
+    # which case the caller parses the text file as usual.
+    with open(level_file, 'rb') as file:
+        digest = hashlib.sha256(file.read()).hexdigest()
+    compiled = _loaded.get(digest)
+    if compiled is not None:
+        return compiled
+
+    path = cache_path(level_file, digest)
+    try:
+        try:
+            compiled = CompiledLevel(path)
+        except (FileNotFoundError, ValueError, struct.error):
+            compile_level(level_file, path)
+            compiled = CompiledLevel(path)
+    except OSError:
+        return None
+    _loaded[digest] = compiled
+    return compiled
+
+
+if __name__ == "__main__":
+    # Compile (or refresh) the cache for the given level files
+    for level_file in sys.argv[1:]:
+        with open(level_file, 'rb') as file:
+            path = cache_path(level_file, hashlib.sha256(file.read()).hexdigest())
+        compile_level(level_file, path)
+        print(f"{level_file} -> {path} ({os.path.getsize(path)} bytes)")
@@ -1,108 +1,235 @@
+import argparse
 import pygame
+import random
 import sys
-from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, CELL_SIZE
-from level import Level
-from pacman import Pacman
-from ghost import Ghost
+from time import perf_counter
+from camera import Camera
+from capture import FrameCapture
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, TICK_RATE
+from directions import RIGHT, LEFT, UP, DOWN
+from game import GameState, LEVEL_FILE
+from hud import Hud
+from profiler import Profiler, ProfilerOverlay
+from renderer import DirtyRectRenderer
+from replay import Recording, Player, MAX_SEED
+from sprites import build_atlas
+from telemetry import Telemetry
 
-def main():
+# Keyboard input is translated to directions at the boundary, the game
+# itself never sees pygame events
+KEY_DIRECTIONS = {
+    pygame.K_RIGHT: RIGHT,
+    pygame.K_LEFT: LEFT,
+    pygame.K_UP: UP,
+    pygame.K_DOWN: DOWN
+}
+
+# Longest frame time the simulation catches up on
+MAX_FRAME_TIME = 0.25
+
+
+def seed_argument(text):
+    # --seed, limited to what a recording can store
+    seed = int(text)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError(f"must be from 0 to {MAX_SEED}")
+    return seed
+
+def main(dirty_rects=False, record=None, replay=None, seek=0, seed=None,
+         profile=False, profile_overlay=False, profile_dump=None, fps=FPS, telemetry=None,
+         capture=None):
+    # `record` saves this session's inputs to a file, `replay` plays one
+    # back (starting at tick `seek`) instead of reading the keyboard.
+    # `profile` times each phase of the loop, shown on screen with
+    # `profile_overlay` and written to `profile_dump` (.csv or .json) at exit.
+    # `fps` only changes how often the screen is drawn, never game speed.
+    # `telemetry` logs the game's events to a file, see telemetry.py.
+    # `capture` saves every frame shown, see capture.py.
     pygame.init()
 
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Pacman")
     clock = pygame.time.Clock()
-    
+
     # Initialize game elements
-    level = Level('levels/level1.txt')
-    pacman = Pacman(8, 14, level)
-    
-    # Create ghosts with different personalities
-    ghosts = [
-        Ghost(13, 11, level, 'blinky', pacman),  # Red ghost - direct chaser
-        Ghost(14, 11, level, 'pinky', pacman),   # Pink ghost - ambusher
-        Ghost(13, 12, level, 'inky', pacman),    # Cyan ghost - unpredictable
-        Ghost(14, 12, level, 'clyde', pacman)    # Orange ghost - random
-    ]
-    
+    player = None
+    recording = None
+    if replay:
+        player = Player(Recording.load(replay))
+        game = player.seek(seek)
+    else:
+        # Every game gets a seed so it can be recorded and replayed
+        seed = seed if seed is not None else random.getrandbits(64)
+        game = GameState(LEVEL_FILE, seed=seed)
+        if record:
+            recording = Recording(LEVEL_FILE, seed)
+    level = game.level
+    # The maze is pre-rendered in chunks as they come into view
+    level.build_layers()
+    # Pre-render every Pacman and ghost animation frame
+    build_atlas()
+    # Font is loaded once and rendered text cached
+    hud = Hud()
+    # Optionally only push the regions that changed to the display
+    renderer = DirtyRectRenderer(screen, level) if dirty_rects else None
+
+    profiler = None
+    overlay = None
+    if profile or profile_overlay or profile_dump:
+        profiler = game.profiler = Profiler()
+        if profile_overlay:
+            overlay = ProfilerOverlay(profiler)
+
+    log = None
+    if telemetry:
+        log = Telemetry(telemetry)
+        game.log_to(log)
+
+    frames = FrameCapture(capture, screen.get_size()) if capture else None
+
+    # Save the recording, profile, telemetry and capture however the session ends
+    try:
+        run(game, screen, clock, fps, hud, renderer, player, recording, profiler, overlay, frames)
+    finally:
+        if recording is not None:
+            recording.save(record, game)
+        if profile_dump:
+            profiler.dump(profile_dump)
+        if log is not None:
+            log.close()
+        if frames is not None:
+            frames.close()
+            print(f"Captured {frames.captured} frames to {capture}, skipped {frames.dropped}")
+
+def run(game, screen, clock, fps, hud, renderer, player, recording, profiler, overlay, frames):
+    level = game.level
+    pacman = game.pacman
+    ghosts = game.ghosts
+    camera = Camera(level, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+    def draw_hud(surface):
+        rects = hud.draw(surface, pacman)
+        if overlay:
+            rects += overlay.draw(surface)
+        return rects
+
+    # Fixed timestep: real time accumulates and is spent in whole logic
+    # ticks, so gameplay runs at TICK_RATE whatever the frame rate. Sprites
+    # are drawn `alpha` of the way from their previous tick's position.
+    tick_time = 1 / TICK_RATE
+    accumulator = 0.0
+    previous_time = perf_counter()
+    action = None
+
     # Game loop
     while True:
+        if profiler is not None:
+            frame_start = start = profiler.start()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.KEYDOWN:
-                pacman.handle_keypress(event)
-        
-        # Update game state
-        pacman.move()
-        
-        # Check if power pellet was eaten
-        if level.power_pellet_eaten:
-            for ghost in ghosts:
-                ghost.make_vulnerable()
-            level.power_pellet_eaten = False
-        
-        # Update ghosts
-        for ghost in ghosts:
-            ghost.update()
-        
-        # Check if level is complete (all dots and power pellets eaten)
-        if level.is_complete():
-            # You could load the next level here or show a victory screen
-            print("Level Complete!")
-            pygame.quit()
-            sys.exit()
-            
-        # Check if pacman is dead
-        if pacman.dead:
-            pacman.lives -= 1
-            if pacman.lives <= 0:
+                # Store the requested direction until the next tick uses it
+                action = KEY_DIRECTIONS.get(event.key, action)
+        if profiler is not None:
+            start = profiler.record('events', start)
+
+        # Update game state, skipping time we'll never catch up on after a
+        # stall rather than running a burst of ticks
+        now = perf_counter()
+        accumulator += min(now - previous_time, MAX_FRAME_TIME)
+        previous_time = now
+        while accumulator >= tick_time:
+            accumulator -= tick_time
+            if player:
+                if player.step() and not game.done:
+                    print("End of recording")
+                    pygame.quit()
+                    sys.exit()
+            else:
+                if recording is not None:
+                    recording.record(action)
+                game.step(action)
+            action = None
+
+            if game.complete:
+                # You could load the next level here or show a victory screen
+                print("Level Complete!")
+                pygame.quit()
+                sys.exit()
+
+            if game.game_over:
                 # Game over logic would go here
                 print("Game Over!")
                 pygame.quit()
                 sys.exit()
-            else:
-                # Reset positions
-                pacman.grid_x = 8
-                pacman.grid_y = 14
-                pacman.pixel_x = pacman.grid_x * CELL_SIZE
-                pacman.pixel_y = pacman.grid_y * CELL_SIZE
-                pacman.direction = None
-                pacman.queued_direction = None
-                pacman.dead = False
-                pacman.ghost_score_multiplier = 1
-                
-                # Reset ghosts
-                for i, ghost in enumerate(ghosts):
-                    ghost.grid_x = 13 + (i % 2)
-                    ghost.grid_y = 11 + (i // 2)
-                    ghost.pixel_x = ghost.grid_x * CELL_SIZE
-                    ghost.pixel_y = ghost.grid_y * CELL_SIZE
-                    ghost.direction = 'left'
-                    ghost.vulnerable = False
-                    ghost.returning_home = False
-        
-        # Drawing
-        screen.fill('black')
-        level.draw(screen)
-        pacman.draw(screen)
-        
-        # Draw ghosts
-        for ghost in ghosts:
-            ghost.draw(screen)
-        
-        # Draw score
-        font = pygame.font.SysFont('Arial', 24)
-        score_text = font.render(f'Score: {pacman.score}', True, 'white')
-        screen.blit(score_text, (10, 10))
-        
-        # Draw lives
-        lives_text = font.render(f'Lives: {pacman.lives}', True, 'white')
-        screen.blit(lives_text, (SCREEN_WIDTH - 100, 10))
-
-        # Update display
-        pygame.display.flip()
-        clock.tick(FPS)
-    
+        if profiler is not None:
+            start = profiler.record('step', start)
+        alpha = accumulator / tick_time
+
+        # Drawing, scrolled to keep Pacman in view on mazes larger than the
+        # screen; sprites off screen are skipped
+        offset = camera.follow(pacman, alpha)
+        sprites = camera.visible([pacman] + ghosts)
+        if renderer:
+            renderer.render(sprites, draw_hud, alpha, offset)
+            if profiler is not None:
+                start = profiler.record('render', start)
+        else:
+            screen.fill('black')
+            level.draw(screen, offset)
+            if profiler is not None:
+                start = profiler.record('level.draw', start)
+
+            # Draw Pacman and the ghosts
+            for sprite in sprites:
+                sprite.draw(screen, alpha, offset)
+            if profiler is not None:
+                start = profiler.record('sprites', start)
+
+            # Draw score and lives
+            draw_hud(screen)
+            if profiler is not None:
+                start = profiler.record('hud', start)
+
+            # Update display
+            pygame.display.flip()
+            if profiler is not None:
+                start = profiler.record('display.flip', start)
+
+        if frames is not None:
+            # Skipped rather than waited for if the encoder is behind
+            frames.capture(screen)
+            if profiler is not None:
+                start = profiler.record('capture', start)
+
+        clock.tick(fps)
+        if profiler is not None:
+            profiler.record('idle', start)
+            profiler.record('frame', frame_start)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pacman")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="only redraw and update the screen regions that changed")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help=f"render rate; the game itself always runs at {TICK_RATE} ticks a second")
+    parser.add_argument('--seed', type=seed_argument, help="seed for the ghosts' random choices")
+    parser.add_argument('--record', metavar='PATH', help="save this session's inputs for replay.py")
+    parser.add_argument('--replay', metavar='PATH', help="watch a recorded session")
+    parser.add_argument('--seek', type=int, default=0, metavar='TICK',
+                        help="with --replay, start watching at this tick")
+    parser.add_argument('--profile', action='store_true',
+                        help="time each phase of the game loop (implied by the options below)")
+    parser.add_argument('--profile-overlay', action='store_true',
+                        help="show p50/p95/p99 phase timings on screen")
+    parser.add_argument('--profile-dump', metavar='PATH',
+                        help="write phase timings to a .csv or .json file at exit")
+    parser.add_argument('--telemetry', metavar='PATH',
+                        help="log game events (items, ghosts eaten, deaths) to a telemetry file")
+    parser.add_argument('--capture', metavar='PATH',
+                        help="save every frame as PNGs in a directory, or raw RGB to a .rgb file")
+    args = parser.parse_args()
+    main(args.dirty_rects, args.record, args.replay, args.seek, args.seed,
+         args.profile, args.profile_overlay, args.profile_dump, args.fps, args.telemetry, args.capture)
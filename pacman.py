@@ -1,35 +1,50 @@
-import pygame
-import math
-from constants import CELL_SIZE
+from operator import attrgetter
+from constants import CELL_SIZE, DOT_POINTS, POWERUP_POINTS
+from directions import NONE, DX, DY, ROTATION, FAR_EDGE
+from telemetry import GHOST_EATEN
+
+# Everything about Pacman that changes during a game, see get_state()
+STATE_FIELDS = ('grid_x', 'grid_y', 'pixel_x', 'pixel_y', 'direction', 'queued_direction',
+                'score', 'lives', 'dead', 'ghost_score_multiplier',
+                'mouth_angle', 'mouth_opening', 'rotation')
+_get_state = attrgetter(*STATE_FIELDS)
 
 class Pacman:
+    SPEED = 2  # Pixels per tick
+
+    # One Pacman per game, but games can number in the thousands
+    __slots__ = STATE_FIELDS + ('prev_pixel_x', 'prev_pixel_y', 'level', 'telemetry')
+
     def __init__(self, start_x, start_y, level):
         self.grid_x = start_x
         self.grid_y = start_y
         self.pixel_x = start_x * CELL_SIZE
         self.pixel_y = start_y * CELL_SIZE
+        # Position before the last tick, for drawing between ticks
+        self.prev_pixel_x = self.pixel_x
+        self.prev_pixel_y = self.pixel_y
         self.level = level
-        self.direction = None
-        self.queued_direction = None  # Store the next turn
+        self.direction = NONE
+        self.queued_direction = NONE  # Store the next turn
         self.score = 0
         self.lives = 3
         self.dead = False
-        self.speed = 2
         self.mouth_angle = 45  # Angle for the mouth opening
         self.mouth_opening = True  # Whether mouth is opening or closing
         self.rotation = 0
         self.ghost_score_multiplier = 1  # For consecutive ghost eating
+        self.telemetry = None  # Optional telemetry.Telemetry, set by the game
+
+    def get_state(self):
+        # Plain tuple of STATE_FIELDS, for cheap game snapshots
+        return _get_state(self)
 
-    def handle_keypress(self, event):
-        # Store the requested direction instead of immediately changing
-        if event.key == pygame.K_RIGHT:
-            self.queued_direction = 'right'
-        elif event.key == pygame.K_LEFT:
-            self.queued_direction = 'left'
-        elif event.key == pygame.K_UP:
-            self.queued_direction = 'up'
-        elif event.key == pygame.K_DOWN:
-            self.queued_direction = 'down'
+    def set_state(self, state):
+        (self.grid_x, self.grid_y, self.pixel_x, self.pixel_y, self.direction, self.queued_direction,
+         self.score, self.lives, self.dead, self.ghost_score_multiplier,
+         self.mouth_angle, self.mouth_opening, self.rotation) = state
+        self.prev_pixel_x = self.pixel_x
+        self.prev_pixel_y = self.pixel_y
 
     def is_aligned_with_grid(self):
         # Check if Pac-Man is aligned with the grid
@@ -39,47 +54,30 @@ class Pacman:
     def try_queued_direction(self):
         if self.queued_direction and self.is_aligned_with_grid():
             # Calculate the next grid position for the queued direction
-            next_grid_x = self.grid_x
-            next_grid_y = self.grid_y
-            
-            if self.queued_direction == 'right':
-                next_grid_x += 1
-            elif self.queued_direction == 'left':
-                next_grid_x -= 1
-            elif self.queued_direction == 'up':
-                next_grid_y -= 1
-            elif self.queued_direction == 'down':
-                next_grid_y += 1
+            next_grid_x = self.grid_x + DX[self.queued_direction]
+            next_grid_y = self.grid_y + DY[self.queued_direction]
 
             # If the turn is valid, make it
             if self.is_valid_move(next_grid_x, next_grid_y):
                 self.direction = self.queued_direction
-                self.queued_direction = None
+                self.queued_direction = NONE
 
     def move(self):
         # Try to make the queued turn first
         self.try_queued_direction()
 
-        if self.direction:
+        direction = self.direction
+        if direction:
             # Calculate next pixel position
-            next_pixel_x = self.pixel_x
-            next_pixel_y = self.pixel_y
-            
-            if self.direction == 'right':
-                next_pixel_x += self.speed
-            elif self.direction == 'left':
-                next_pixel_x -= self.speed
-            elif self.direction == 'up':
-                next_pixel_y -= self.speed
-            elif self.direction == 'down':
-                next_pixel_y += self.speed
+            next_pixel_x = self.pixel_x + DX[direction] * self.SPEED
+            next_pixel_y = self.pixel_y + DY[direction] * self.SPEED
 
             # Calculate the grid position we're moving to
             next_grid_x = next_pixel_x // CELL_SIZE
             next_grid_y = next_pixel_y // CELL_SIZE
             
             # For right and down movement, check the far edge
-            if self.direction in ['right', 'down']:
+            if FAR_EDGE[direction]:
                 edge_x = (next_pixel_x + (CELL_SIZE - 1)) // CELL_SIZE
                 edge_y = (next_pixel_y + (CELL_SIZE - 1)) // CELL_SIZE
                 if not (self.is_valid_move(next_grid_x, next_grid_y) and 
@@ -105,9 +103,9 @@ class Pacman:
                 self.grid_x = next_grid_x
                 self.grid_y = next_grid_y
                 if self.level.collect_dot(self.grid_x, self.grid_y):
-                    self.score += 10
+                    self.score += DOT_POINTS
                 if self.level.collect_powerup(self.grid_x, self.grid_y):
-                    self.score += 50
+                    self.score += POWERUP_POINTS
                     # Reset ghost score multiplier when a new power pellet is eaten
                     self.ghost_score_multiplier = 1
 
@@ -116,30 +114,16 @@ class Pacman:
         ghost_points = 200 * self.ghost_score_multiplier
         self.score += ghost_points
         self.ghost_score_multiplier *= 2
+        if self.telemetry is not None:
+            self.telemetry.record(GHOST_EATEN, self.grid_x, self.grid_y, ghost_points)
         return ghost_points
 
     def is_valid_move(self, next_grid_x, next_grid_y):
-        # Check bounds
-        inbounds = (next_grid_x >= 0 and 
-                    next_grid_x < len(self.level.level[0]) and 
-                    next_grid_y >= 0 and 
-                    next_grid_y < len(self.level.level))
-        if not inbounds:
-            return False
-            
-        # Check for wall
-        return not self.level.is_wall(next_grid_x, next_grid_y)
-
-    def draw(self, screen):
-        # Draw the base yellow circle
-        center_x = self.pixel_x + CELL_SIZE // 2
-        center_y = self.pixel_y + CELL_SIZE // 2
-        radius = CELL_SIZE // 2 - 2
-        
-        # Base circle
-        pygame.draw.circle(screen, 'yellow', (center_x, center_y), radius)
-        
-        # Update mouth animation
+        # Bounds and walls in one lookup
+        return self.level.is_walkable(next_grid_x, next_grid_y)
+
+    def animate(self):
+        # Advance the mouth animation by one tick
         if self.mouth_opening:
             self.mouth_angle += 3
             if self.mouth_angle >= 45:
@@ -148,24 +132,18 @@ class Pacman:
             self.mouth_angle -= 3
             if self.mouth_angle <= 5:
                 self.mouth_opening = True
-        
+
+    def draw(self, screen, alpha=1.0, offset=(0, 0)):
+        # `alpha` is how far the display is between the previous tick and
+        # this one, `offset` the camera position. Returns the rect drawn.
+        # Imported here so the game logic stays usable without a display
+        from sprites import pacman_sprite
+
         # Set rotation based on direction
-        if self.direction == 'right':
-            self.rotation = 0
-        elif self.direction == 'left':
-            self.rotation = 180
-        elif self.direction == 'up':
-            self.rotation = 90
-        elif self.direction == 'down':
-            self.rotation = 270
-        
-        # Draw mouth using an arc
-        # Convert rotation and mouth angle to radians for pygame
-        start_angle = math.radians(self.rotation - self.mouth_angle)
-        end_angle = math.radians(self.rotation + self.mouth_angle)
-        
-        # Draw the mouth as a black "pie slice"
-        pygame.draw.arc(screen, 'black', 
-                    (center_x - radius, center_y - radius, 
-                        radius * 2, radius * 2),
-                    start_angle, end_angle, radius)
\ No newline at end of file
+        if self.direction:
+            self.rotation = ROTATION[self.direction]
+
+        # Every rotation/mouth combination is pre-rendered in the sprite atlas
+        x = self.prev_pixel_x + (self.pixel_x - self.prev_pixel_x) * alpha - offset[0]
+        y = self.prev_pixel_y + (self.pixel_y - self.prev_pixel_y) * alpha - offset[1]
+        return screen.blit(pacman_sprite(self.rotation, self.mouth_angle), (x, y))
@@ -0,0 +1,121 @@
+import csv
+import json
+import os
+from collections import deque
+from time import perf_counter
+
+# Per-phase frame timings. Code that wants to be measured takes an optional
+# profiler and brackets each phase with start()/record(); when the profiler
+# is None the only cost is the `is not None` checks. Each phase keeps a
+# rolling window of recent samples for percentiles plus all-time totals.
+#
+#     start = profiler.start()
+#     pacman.move()
+#     start = profiler.record('pacman.move', start)
+#     ...
+
+WINDOW = 600  # Ten seconds of frames at 60 FPS
+OVERLAY_REFRESH = 30  # Frames between overlay updates, so it stays readable
+
+
+class PhaseStats:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentiles(self, *points):
+        # Nearest-rank percentiles of the rolling window, in seconds
+        ordered = sorted(self.samples)
+        if not ordered:
+            return [0.0] * len(points)
+        return [ordered[min(len(ordered) - 1, int(len(ordered) * point / 100))] for point in points]
+
+
+class Profiler:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.phases = {}  # name -> PhaseStats, in the order first recorded
+
+    def start(self):
+        return perf_counter()
+
+    def record(self, phase, start):
+        # Add the time since `start` to a phase and return now, so
+        # consecutive phases can be chained
+        now = perf_counter()
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = PhaseStats(self.window)
+        stats.add(now - start)
+        return now
+
+    def report(self):
+        # One row per phase, times in milliseconds
+        rows = []
+        for phase, stats in self.phases.items():
+            p50, p95, p99 = stats.percentiles(50, 95, 99)
+            rows.append({
+                'phase': phase,
+                'count': stats.count,
+                'mean_ms': 1000 * stats.total / stats.count,
+                'p50_ms': 1000 * p50,
+                'p95_ms': 1000 * p95,
+                'p99_ms': 1000 * p99,
+                'max_ms': 1000 * stats.max,
+            })
+        return rows
+
+    def dump(self, path):
+        # Write report() as JSON or CSV, depending on the file extension.
+        # Percentiles cover the last `window` samples, the rest all samples.
+        rows = self.report()
+        if os.path.splitext(path)[1].lower() == '.json':
+            with open(path, 'w') as file:
+                json.dump({'window': self.window, 'phases': rows}, file, indent=2)
+        else:
+            with open(path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=['phase', 'count', 'mean_ms', 'p50_ms',
+                                                          'p95_ms', 'p99_ms', 'max_ms'])
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+class ProfilerOverlay:
+    # On-screen table of a profiler's p50/p95/p99. The text is re-rendered
+    # every OVERLAY_REFRESH frames and blitted as one surface in between.
+    def __init__(self, profiler, pos=(10, 40), font_size=14):
+        import pygame
+        self.profiler = profiler
+        self.pos = pos
+        self.font = pygame.font.SysFont('monospace', font_size)
+        self.surface = None
+        self.frames = 0
+
+    def render(self):
+        import pygame
+        lines = [f"{'phase':<14}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for row in self.profiler.report():
+            lines.append(f"{row['phase'][:14]:<14}{row['p50_ms']:>7.2f}{row['p95_ms']:>7.2f}{row['p99_ms']:>7.2f}")
+        rendered = [self.font.render(line, True, 'white') for line in lines]
+        height = self.font.get_linesize()
+        surface = pygame.Surface((max(line.get_width() for line in rendered) + 8, height * len(lines) + 8))
+        surface.set_alpha(200)
+        for i, line in enumerate(rendered):
+            surface.blit(line, (4, 4 + i * height))
+        return surface
+
+    def draw(self, screen):
+        # Returns the rects drawn, like Hud.draw()
+        if self.surface is None or self.frames % OVERLAY_REFRESH == 0:
+            self.surface = self.render()
+        self.frames += 1
+        return [screen.blit(self.surface, self.pos)]
@@ -0,0 +1,64 @@
+import pygame
+from constants import CELL_SIZE
+
+# Dirty-rectangle rendering. Instead of clearing and flipping the whole
+# screen every frame, only the areas that changed are restored from the
+# level's pre-rendered chunks and redrawn: where each sprite was last
+# frame, where it is now, the HUD text and any cell whose item was just
+# collected. Only those rects are handed to pygame.display.update(). Once
+# the camera scrolls everything moves, so those frames are drawn in full.
+
+
+class DirtyRectRenderer:
+    def __init__(self, screen, level):
+        self.screen = screen
+        self.level = level
+        self.previous_rects = []  # Everything drawn on top of the maze last frame
+        self.full_redraw = True
+        self.layers_version = level.layers_version
+        self.offset = (0, 0)
+
+    def restore(self, rect):
+        # Put the static background back under a rect
+        rect = rect.clip(self.screen.get_rect())
+        self.screen.fill('black', rect)
+        self.level.draw(self.screen, self.offset, rect)
+
+    def render(self, sprites, draw_hud, alpha=1.0, offset=(0, 0)):
+        # `sprites` have draw(screen, alpha, offset) returning the rect they
+        # drew; `draw_hud(screen)` draws the HUD and returns the rects it
+        # touched. `offset` is the camera position, see Level.draw().
+        screen = self.screen
+        level = self.level
+
+        if (self.full_redraw or level.layers_version != self.layers_version
+                or offset != self.offset):
+            # First frame, the level re-rendered its layers (new game,
+            # restored snapshot) or the camera moved: nothing on screen
+            # can be trusted
+            self.offset = offset
+            screen.fill('black')
+            level.draw(screen, offset)
+            self.layers_version = level.layers_version
+            dirty = None
+        else:
+            dirty = self.previous_rects
+            offset_x, offset_y = offset
+            for x, y in level.cleared_cells:
+                dirty.append(pygame.Rect(x * CELL_SIZE - offset_x, y * CELL_SIZE - offset_y, CELL_SIZE, CELL_SIZE))
+            level.cleared_cells.clear()
+            for rect in dirty:
+                self.restore(rect)
+
+        drawn = []
+        for sprite in sprites:
+            # Padded by a pixel to cover the rounding of fractional positions
+            drawn.append(sprite.draw(screen, alpha, offset).inflate(2, 2))
+        drawn.extend(draw_hud(screen))
+
+        if dirty is None:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(dirty + drawn)
+        self.previous_rects = drawn
@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import struct
+import time
+import zlib
+from constants import TICK_RATE
+from directions import NAMES, code
+from game import GameState
+
+# Input recording and replay. A game is fully determined by its level, its
+# seed and the direction requested on each tick, so that is all a recording
+# holds: one byte per tick, zlib-compressed (a minute of play is typically
+# well under a kilobyte). Replaying re-simulates headless as fast as the game
+# steps, and a Player keeps periodic snapshots so it can seek to any tick
+# without starting over from tick 0.
+#
+# File layout (little-endian):
+#   header      magic, format version, seed, final score, final lives,
+#               sha256 of the level file, length of the level path
+#   level path  utf-8
+#   inputs      zlib-compressed, one direction code per tick (0 for none)
+
+MAGIC = b'PACR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHQIh32sH')
+MAX_SEED = (1 << 64) - 1  # Seeds are stored as unsigned 64-bit integers
+CHECKPOINT_INTERVAL = 10 * TICK_RATE  # Ten seconds of play
+
+
+def level_digest(level_file):
+    with open(level_file, 'rb') as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+class Recording:
+    def __init__(self, level_file, seed, inputs=None, score=0, lives=0):
+        # Checked up front, so a game is never played only to fail at save()
+        if not isinstance(seed, int) or not 0 <= seed <= MAX_SEED:
+            raise ValueError(f"seed must be an integer from 0 to {MAX_SEED} to be recorded, not {seed!r}")
+        self.level_file = level_file
+        self.seed = seed
+        self.inputs = inputs if inputs is not None else bytearray()
+        # Result of the recorded game, to check a replay against
+        self.score = score
+        self.lives = lives
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def record(self, action):
+        # Call once per tick with the action passed to GameState.step()
+        self.inputs.append(code(action))
+
+    def save(self, path, game):
+        self.score = game.pacman.score
+        self.lives = game.pacman.lives
+        level_path = self.level_file.encode('utf-8')
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.seed, self.score, self.lives,
+                                   level_digest(self.level_file), len(level_path)))
+            file.write(level_path)
+            file.write(zlib.compress(self.inputs, 9))
+
+    @classmethod
+    def load(cls, path, level_file=None):
+        # `level_file` overrides the recorded path, e.g. when replaying on
+        # another machine; its contents must still match the recording
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, seed, score, lives, digest, path_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} recording")
+        offset = HEADER.size + path_length
+        if level_file is None:
+            level_file = str(data[HEADER.size:offset], 'utf-8')
+        if level_digest(level_file) != digest:
+            raise ValueError(f"{path} was recorded on a different version of {level_file}")
+        inputs = bytearray(zlib.decompress(data[offset:]))
+        if max(inputs, default=0) >= len(NAMES):
+            raise ValueError(f"{path} contains unknown inputs")
+        return cls(level_file, seed, inputs, score, lives)
+
+
+class Player:
+    # Re-simulates a recording, keeping a snapshot every
+    # `checkpoint_interval` ticks so seeking backwards (or forwards past
+    # somewhere already visited) restarts from the nearest one
+    def __init__(self, recording, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.recording = recording
+        self.checkpoint_interval = checkpoint_interval
+        self.game = GameState(recording.level_file, seed=recording.seed)
+        self.checkpoints = {0: self.game.snapshot()}
+
+    def step(self):
+        # Play the next recorded tick. Returns True at the end of the
+        # recording or when the game is over.
+        game = self.game
+        if game.ticks >= len(self.recording) or game.done:
+            return True
+        game.step(self.recording.inputs[game.ticks])
+        if game.ticks % self.checkpoint_interval == 0 and game.ticks not in self.checkpoints:
+            self.checkpoints[game.ticks] = game.snapshot()
+        return game.ticks >= len(self.recording) or game.done
+
+    def seek(self, tick):
+        tick = max(0, min(tick, len(self.recording)))
+        checkpoint = tick - tick % self.checkpoint_interval
+        while checkpoint not in self.checkpoints:
+            checkpoint -= self.checkpoint_interval
+        if tick < self.game.ticks or checkpoint > self.game.ticks:
+            self.game.restore(self.checkpoints[checkpoint])
+        while self.game.ticks < tick:
+            if self.step():
+                break
+        return self.game
+
+    def run(self):
+        # Fast-forward to the end of the recording
+        return self.seek(len(self.recording))
+
+    def verify(self):
+        # True if replaying reproduces the recorded result
+        game = self.run()
+        return game.pacman.score == self.recording.score and game.pacman.lives == self.recording.lives
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded game headless")
+    parser.add_argument('recording')
+    parser.add_argument('--level', help="level file to use instead of the recorded path")
+    parser.add_argument('--seek', type=int, help="stop at this tick and print the state there")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.recording, args.level)
+    player = Player(recording)
+    start = time.perf_counter()
+    game = player.seek(args.seek) if args.seek is not None else player.run()
+    elapsed = time.perf_counter() - start
+    print(f"{recording.level_file}, seed {recording.seed}: replayed {game.ticks}/{len(recording)} ticks "
+          f"in {elapsed:.2f}s ({game.ticks / max(elapsed, 1e-9):,.0f} ticks/s)")
+    print(f"score {game.pacman.score}, lives {game.pacman.lives}, "
+          f"complete {game.complete}, game over {game.game_over}")
+    if args.seek is None:
+        matches = game.pacman.score == recording.score and game.pacman.lives == recording.lives
+        print("matches the recording" if matches else
+              f"DIFFERS from the recording (score {recording.score}, lives {recording.lives})")
@@ -0,0 +1,134 @@
+import argparse
+import copy
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from constants import TICK_RATE
+from directions import RIGHT, LEFT, UP, DOWN
+from game import GameState, LEVEL_FILE
+from telemetry import Telemetry
+
+# Runs many independent games across a process pool. Every game is fully
+# determined by its job (seed, level file, inputs), so results are the same
+# however the jobs get sharded. Each worker process loads a level once and
+# resets it between games.
+#
+# A job's `policy` is one of:
+#   None            no input at all
+#   a sequence      scripted inputs, one direction (or None) per tick
+#   a callable      policy(game) -> direction or None, called every tick;
+#                   must be picklable, e.g. a module-level function or a
+#                   RandomPolicy
+#
+# A job's `telemetry` is a directory to log game events to. Each process
+# appends to its own file there, telemetry-<pid>.pace, and rows carry the
+# game's seed, so the files can simply be loaded and concatenated.
+
+RolloutJob = namedtuple('RolloutJob', ['seed', 'level_file', 'policy', 'max_ticks', 'telemetry'],
+                        defaults=[None])
+RolloutResult = namedtuple('RolloutResult', ['seed', 'level_file', 'score', 'lives_lost', 'ticks', 'completed'])
+
+MAX_TICKS = 10 * 60 * TICK_RATE  # Ten minutes of play
+
+
+class RandomPolicy:
+    # Turns in a random direction every so often, seeded per game
+    def __init__(self, seed, turn_chance=0.05):
+        self.rng = random.Random(seed)
+        self.turn_chance = turn_chance
+
+    def __call__(self, game):
+        if self.rng.random() < self.turn_chance:
+            return self.rng.choice((RIGHT, LEFT, UP, DOWN))
+        return None
+
+
+# One GameState per level file, kept for the lifetime of the worker process
+_worker_games = {}
+# Telemetry file per directory, likewise
+_worker_telemetry = {}
+
+
+def worker_telemetry(directory):
+    telemetry = _worker_telemetry.get(directory)
+    if telemetry is None:
+        path = os.path.join(directory, f'telemetry-{os.getpid()}.pace')
+        telemetry = _worker_telemetry[directory] = Telemetry(path, append=True)
+        # Pool workers never return to our code, so write the file out when
+        # the process exits
+        Finalize(telemetry, telemetry.close, exitpriority=10)
+    return telemetry
+
+
+def play(job):
+    game = _worker_games.get(job.level_file)
+    if game is None:
+        game = _worker_games[job.level_file] = GameState(job.level_file, seed=job.seed)
+    else:
+        game.reset(job.seed)
+    game.log_to(worker_telemetry(job.telemetry) if job.telemetry else None)
+
+    # Policies can carry state such as an RNG, so play a fresh copy to get
+    # the same game every time a job runs
+    policy = copy.deepcopy(job.policy) if callable(job.policy) else job.policy
+    start_lives = game.pacman.lives
+    if policy is None or callable(policy):
+        while game.ticks < job.max_ticks:
+            if game.step(policy(game) if policy else None):
+                break
+    else:
+        for action in policy:
+            if game.ticks >= job.max_ticks or game.step(action):
+                break
+
+    return RolloutResult(job.seed, job.level_file, game.pacman.score,
+                         start_lives - game.pacman.lives, game.ticks, game.complete)
+
+
+def make_jobs(games, seed=0, level_file=LEVEL_FILE, policy=None, max_ticks=MAX_TICKS, telemetry=None):
+    # Jobs with consecutive seeds. `policy` may be a factory taking the
+    # game's seed (like RandomPolicy) so every game gets its own inputs.
+    jobs = []
+    for game_seed in range(seed, seed + games):
+        game_policy = policy(game_seed) if isinstance(policy, type) else policy
+        jobs.append(RolloutJob(game_seed, level_file, game_policy, max_ticks, telemetry))
+    return jobs
+
+
+def run_rollouts(jobs, workers=None, chunksize=8):
+    # Results come back in job order. workers=1 runs in this process.
+    if workers == 1:
+        try:
+            return [play(job) for job in jobs]
+        finally:
+            # Write out this process's telemetry now rather than at exit
+            for telemetry in _worker_telemetry.values():
+                telemetry.close()
+            _worker_telemetry.clear()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(play, jobs, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many headless games in parallel")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--level', default=LEVEL_FILE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--policy', choices=['none', 'random'], default='random')
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS)
+    parser.add_argument('--telemetry', metavar='DIR', help="log game events to telemetry files in DIR")
+    args = parser.parse_args()
+
+    policy = RandomPolicy if args.policy == 'random' else None
+    if args.telemetry:
+        os.makedirs(args.telemetry, exist_ok=True)
+    jobs = make_jobs(args.games, args.seed, args.level, policy, args.max_ticks, args.telemetry)
+    results = run_rollouts(jobs, args.workers)
+    for result in results:
+        print(f"seed {result.seed}: score {result.score}, lives lost {result.lives_lost}, "
+              f"ticks {result.ticks}, completed {result.completed}")
+    print(f"mean score {sum(result.score for result in results) / len(results):.1f}, "
+          f"completed {sum(result.completed for result in results)}/{len(results)}")
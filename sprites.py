@@ -0,0 +1,159 @@
+import math
+import pygame
+from constants import CELL_SIZE
+from directions import NONE, ALL, DX, DY
+from ghost import Ghost
+
+# Sprite atlas. Every frame Pacman and the ghosts can actually show is drawn
+# once into its own cell-sized surface, so drawing a sprite becomes a dict
+# lookup and a blit. Frames that were not built up front (e.g. a custom
+# ghost colour) are rendered on first use and cached the same way.
+
+PACMAN_ROTATIONS = [0, 90, 180, 270]
+PUPIL_DIRECTIONS = ALL + (NONE,)
+GHOST_BODY_COLORS = ['red', 'pink', 'cyan', 'orange', 'blue', 'white']
+
+_pacman_frames = {}  # (rotation, mouth_angle) -> Surface
+_ghost_frames = {}   # (body color or None, animation_frame, direction) -> Surface
+
+
+def pacman_mouth_angles():
+    # Walk the mouth animation from Pacman.draw until it loops
+    angles = []
+    mouth_angle, mouth_opening = 45, True
+    while (mouth_angle, mouth_opening) not in angles:
+        angles.append((mouth_angle, mouth_opening))
+        if mouth_opening:
+            mouth_angle += 3
+            if mouth_angle >= 45:
+                mouth_opening = False
+        else:
+            mouth_angle -= 3
+            if mouth_angle <= 5:
+                mouth_opening = True
+    return sorted({angle for angle, _ in angles})
+
+
+def ghost_animation_frames(animation_speed=None):
+    # The exact float values Ghost.update steps animation_frame through
+    if animation_speed is None:
+        animation_speed = Ghost.ANIMATION_SPEED
+    frames = []
+    animation_frame = 0
+    while animation_frame not in frames:
+        frames.append(animation_frame)
+        animation_frame += animation_speed
+        if animation_frame >= 2:
+            animation_frame = 0
+    return frames
+
+
+def new_sprite():
+    sprite = pygame.Surface((CELL_SIZE, CELL_SIZE), pygame.SRCALPHA)
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert_alpha()
+    sprite.fill((0, 0, 0, 0))
+    return sprite
+
+
+def render_pacman(rotation, mouth_angle):
+    sprite = new_sprite()
+    center_x = CELL_SIZE // 2
+    center_y = CELL_SIZE // 2
+    radius = CELL_SIZE // 2 - 2
+
+    # Base circle
+    pygame.draw.circle(sprite, 'yellow', (center_x, center_y), radius)
+
+    # Draw the mouth as a black "pie slice"
+    start_angle = math.radians(rotation - mouth_angle)
+    end_angle = math.radians(rotation + mouth_angle)
+    pygame.draw.arc(sprite, 'black',
+                    (center_x - radius, center_y - radius,
+                        radius * 2, radius * 2),
+                    start_angle, end_angle, radius)
+    return sprite
+
+
+def render_ghost(color, animation_frame, direction):
+    # `color` is None for a ghost returning home, which is only its eyes
+    sprite = new_sprite()
+    center_x = CELL_SIZE // 2
+    center_y = CELL_SIZE // 2
+    radius = CELL_SIZE // 2 - 2
+
+    if color is not None:
+        # Draw main body (semi-circle)
+        pygame.draw.circle(sprite, color, (center_x, center_y - 2), radius)
+
+        # Draw bottom part (wavy)
+        wave_height = abs(math.sin(animation_frame * math.pi)) * 3 + 2
+
+        points = [
+            (center_x - radius, center_y - 2),  # Bottom left of semi-circle
+            (center_x - radius, center_y + wave_height),
+            (center_x - radius + radius // 2, center_y - wave_height // 2),
+            (center_x, center_y + wave_height),
+            (center_x + radius // 2, center_y - wave_height // 2),
+            (center_x + radius, center_y + wave_height),
+            (center_x + radius, center_y - 2)  # Bottom right of semi-circle
+        ]
+
+        pygame.draw.polygon(sprite, color, points)
+
+    # Draw eyes (white circles)
+    eye_radius = radius // 3
+    eye_distance = radius // 2
+
+    left_eye_pos = (center_x - eye_distance, center_y - eye_distance // 2)
+    right_eye_pos = (center_x + eye_distance, center_y - eye_distance // 2)
+
+    pygame.draw.circle(sprite, 'white', left_eye_pos, eye_radius)
+    pygame.draw.circle(sprite, 'white', right_eye_pos, eye_radius)
+
+    # Draw pupils (blue dots), shifted towards the direction of travel
+    pupil_radius = eye_radius // 2
+    pupil_offset_x = DX[direction] * pupil_radius
+    pupil_offset_y = DY[direction] * pupil_radius
+
+    left_pupil_pos = (left_eye_pos[0] + pupil_offset_x, left_eye_pos[1] + pupil_offset_y)
+    right_pupil_pos = (right_eye_pos[0] + pupil_offset_x, right_eye_pos[1] + pupil_offset_y)
+
+    pygame.draw.circle(sprite, 'blue', left_pupil_pos, pupil_radius)
+    pygame.draw.circle(sprite, 'blue', right_pupil_pos, pupil_radius)
+    return sprite
+
+
+def build_atlas():
+    # Pre-render every reachable frame. Call once the display is set up so
+    # the surfaces get converted to the screen's pixel format.
+    _pacman_frames.clear()
+    _ghost_frames.clear()
+    for rotation in PACMAN_ROTATIONS:
+        for mouth_angle in pacman_mouth_angles():
+            _pacman_frames[(rotation, mouth_angle)] = render_pacman(rotation, mouth_angle)
+
+    for direction in PUPIL_DIRECTIONS:
+        # Eyes only do not animate
+        _ghost_frames[(None, 0, direction)] = render_ghost(None, 0, direction)
+        for animation_frame in ghost_animation_frames():
+            for color in GHOST_BODY_COLORS:
+                key = (color, animation_frame, direction)
+                _ghost_frames[key] = render_ghost(color, animation_frame, direction)
+
+
+def pacman_sprite(rotation, mouth_angle):
+    sprite = _pacman_frames.get((rotation, mouth_angle))
+    if sprite is None:
+        sprite = _pacman_frames[(rotation, mouth_angle)] = render_pacman(rotation, mouth_angle)
+    return sprite
+
+
+def ghost_sprite(color, animation_frame, direction):
+    if color is None:
+        animation_frame = 0
+    key = (color, animation_frame, direction)
+    sprite = _ghost_frames.get(key)
+    if sprite is None:
+        sprite = _ghost_frames[key] = render_ghost(color, animation_frame, direction)
+    return sprite
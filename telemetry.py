@@ -0,0 +1,186 @@
+import argparse
+import queue
+import struct
+import sys
+import threading
+from array import array
+
+# Game event log for analysing many games: score curves, where Pacman dies,
+# how long levels take. Events are written into preallocated column buffers
+# (one array per column) and every full batch is handed to a background
+# thread that appends it to the file, so recording an event never waits on
+# I/O. Buffers the writer is done with are reused; if it falls behind, new
+# ones are allocated rather than blocking the game.
+#
+# One row per event:
+#   game   the game's seed (0 for unseeded games), so events can be tied to
+#          replays and rollout results
+#   tick   game tick the event happened on
+#   event  index into EVENTS
+#   x, y   Pacman's cell (the cell of the item for dots and pellets)
+#   value  points scored for dot, pellet and ghost, lives left for death,
+#          the final score for complete and game_over
+#
+# File layout, an Arrow-like stream of record batches:
+#   header  magic, format version, byte order ('<' or '>'), column count,
+#           then each column's name and array typecode
+#   batch   row count (uint32), then each column's values back to back
+# Load one with load(), or summarise it with `python telemetry.py FILE`.
+
+EVENTS = ('dot', 'pellet', 'ghost', 'death', 'complete', 'game_over')
+DOT_EATEN, PELLET_EATEN, GHOST_EATEN, DEATH, LEVEL_COMPLETE, GAME_OVER = range(len(EVENTS))
+
+COLUMNS = (('game', 'Q'), ('tick', 'I'), ('event', 'B'), ('x', 'h'), ('y', 'h'), ('value', 'i'))
+
+MAGIC = b'PACE'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHcB')
+COUNT = struct.Struct('<I')
+BATCH_SIZE = 1 << 16  # Rows per buffer
+SEED_MASK = (1 << 64) - 1
+
+
+def file_header():
+    byte_order = b'<' if sys.byteorder == 'little' else b'>'
+    return HEADER.pack(MAGIC, FORMAT_VERSION, byte_order, len(COLUMNS)) + b''.join(
+        bytes([len(name)]) + name.encode() + typecode.encode() for name, typecode in COLUMNS)
+
+
+class Telemetry:
+    def __init__(self, path, batch_size=BATCH_SIZE, append=False):
+        # With `append`, batches are added to the end of an existing file
+        # (written by this version on this machine) instead of replacing it
+        self.path = path
+        self.batch_size = batch_size
+        header = file_header()
+        self.file = open(path, 'ab' if append else 'wb')
+        if self.file.tell() == 0:
+            self.file.write(header)
+        else:
+            with open(path, 'rb') as existing:
+                if existing.read(len(header)) != header:
+                    self.file.close()
+                    raise ValueError(f"can't append to {path}, it is not a matching telemetry file")
+
+        # Set by the game every tick, see begin_tick()
+        self.game = 0
+        self.tick = 0
+        self.columns = self.allocate()
+        self.count = 0  # Rows used in self.columns
+
+        self.pending = queue.SimpleQueue()  # (columns, count) to write, None to stop
+        self.free = queue.SimpleQueue()  # Written buffers, ready for reuse
+        self.error = None
+        self.writer = threading.Thread(target=self.write_batches, name='telemetry', daemon=True)
+        self.writer.start()
+
+    def allocate(self):
+        return [array(typecode, bytes(array(typecode).itemsize * self.batch_size))
+                for _, typecode in COLUMNS]
+
+    def begin_tick(self, seed, tick):
+        # Which game and tick the following events belong to
+        self.game = (seed or 0) & SEED_MASK
+        self.tick = tick
+
+    def record(self, event, x, y, value=0):
+        games, ticks, events, xs, ys, values = self.columns
+        row = self.count
+        games[row] = self.game
+        ticks[row] = self.tick
+        events[row] = event
+        xs[row] = x
+        ys[row] = y
+        values[row] = value
+        self.count = row + 1
+        if self.count == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Hand the rows recorded so far to the writer and carry on in a
+        # fresh buffer
+        if not self.count:
+            return
+        self.pending.put((self.columns, self.count))
+        try:
+            self.columns = self.free.get_nowait()
+        except queue.Empty:
+            self.columns = self.allocate()
+        self.count = 0
+
+    def close(self):
+        # Write out everything recorded and close the file
+        if self.file.closed:
+            return
+        self.flush()
+        self.pending.put(None)
+        self.writer.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def write_batches(self):
+        # Writer thread
+        while True:
+            batch = self.pending.get()
+            if batch is None:
+                return
+            columns, count = batch
+            if self.error is None:
+                try:
+                    self.file.write(COUNT.pack(count))
+                    for column in columns:
+                        self.file.write(memoryview(column)[:count])
+                except OSError as error:
+                    # Reported by close(); the game keeps running meanwhile
+                    self.error = error
+            self.free.put(columns)
+
+
+def load(path):
+    # Every column of a telemetry file as a NumPy array, by name
+    import numpy as np
+
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, byte_order, column_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} telemetry file")
+    offset = HEADER.size
+    dtypes = []
+    for _ in range(column_count):
+        length = data[offset]
+        name = data[offset + 1:offset + 1 + length].decode()
+        typecode = chr(data[offset + 1 + length])
+        offset += length + 2
+        dtypes.append((name, np.dtype(typecode).newbyteorder(byte_order.decode())))
+
+    batches = {name: [] for name, _ in dtypes}
+    while offset < len(data):
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        for name, dtype in dtypes:
+            batches[name].append(np.frombuffer(data, dtype, count, offset))
+            offset += count * dtype.itemsize
+    return {name: np.concatenate(parts) if parts else np.zeros(0, dtype)
+            for (name, dtype), parts in zip(dtypes, batches.values())}
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Summarise a telemetry file")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    columns = load(args.path)
+    events = columns['event']
+    print(f"{len(events)} events from {len(np.unique(columns['game']))} games")
+    for code, name in enumerate(EVENTS):
+        print(f"{name:>10} {np.count_nonzero(events == code):>12}")
+    deaths = events == DEATH
+    if deaths.any():
+        cells, counts = np.unique(np.stack([columns['x'][deaths], columns['y'][deaths]], axis=1),
+                                  axis=0, return_counts=True)
+        top = np.argsort(-counts)[:5]
+        print("most deaths at", ', '.join(f"({x}, {y}) x{count}" for (x, y), count in zip(cells[top], counts[top])))